@@ -1,10 +1,35 @@
 import os
+import secrets
 from pathlib import Path
+from typing import Optional, Sequence
 
 from flask import Flask, send_from_directory
 
+from app.artifacts import ArtifactManifest, get_default_artifact_root
+from app.cache import LRUCache, get_default_cache_dir
+from app.catalog import RunCatalog
+from app.loader import SUMMARY_COLUMNS
+from app.progress import StreamLimiter
 
-def create_app(results_dir: Path) -> Flask:
+DEFAULT_CACHE_MB = 1024
+EXPORT_CACHE_MB = 16
+RESULT_CACHE_MB = 256
+DEFAULT_PAGE_CACHE_MB = 32
+DEFAULT_PER_PAGE = 20
+PROGRESS_INTERVAL = 1.0
+PROGRESS_TIMEOUT = 300.0
+DEFAULT_MAX_STREAMS = 2
+
+
+def create_app(  # pylint: disable=too-many-arguments,too-many-locals
+        results_dir: Path, cache_dir: Optional[Path] = None,
+        cache_mb: int = DEFAULT_CACHE_MB, load_workers: Optional[int] = None,
+        search_columns: Sequence[str] = tuple(SUMMARY_COLUMNS),
+        query_mode: str = "memory", scan_interval: float = 1.0,
+        live: bool = False, per_page: int = DEFAULT_PER_PAGE,
+        artifact_root: Optional[Path] = None,
+        page_cache_mb: int = DEFAULT_PAGE_CACHE_MB,
+        max_streams: int = DEFAULT_MAX_STREAMS) -> Flask:
     # Path to gemtest-webapp's static folder (CSS, JS, etc.)
     # Get the directory of this file (i.e., gemtest_webapp/app/)
     current_dir = Path(__file__).parent
@@ -17,8 +42,10 @@ def create_app(results_dir: Path) -> Flask:
         static_url_path="/static"
     )
 
-    # Path to image directory (repo-local, not part of gemtest-webapp)
-    image_dir = os.path.join(os.getcwd(), "app", "static", "img")
+    # Files written by visualizers (repo-local, not part of gemtest-webapp), by default in
+    # app/static below the current working directory
+    app.config['ARTIFACT_ROOT'] = str(artifact_root or get_default_artifact_root())
+    image_dir = os.path.join(app.config['ARTIFACT_ROOT'], "img")
 
     # Custom route to serve images
     @app.route("/static/img/<path:filename>")
@@ -28,8 +55,54 @@ def create_app(results_dir: Path) -> Flask:
     # Add your own app config
     app.config['DIR'] = results_dir
 
+    # The session stores the selected test runs and filters of every user. Set the
+    # secret key explicitly when several processes serve the same app.
+    app.config['SECRET_KEY'] = os.environ.get("GEMTEST_WEBAPP_SECRET_KEY",
+                                              secrets.token_hex(32))
+    # absolute, so that the cache stays usable when the working directory changes and
+    # sidecar databases can be opened by file URI
+    app.config['CACHE_DIR'] = Path(cache_dir or get_default_cache_dir(results_dir)).resolve()
+    app.config['LOAD_WORKERS'] = load_workers
+    app.config['SEARCH_COLUMNS'] = list(search_columns)
+    # 'memory' loads the selected test runs into pandas, 'sql' answers pages with SQL
+    app.config['QUERY_MODE'] = query_mode
+    # In live mode, test runs that are still being written are updated with their new rows
+    app.config['LIVE_MODE'] = live
+    # Number of MTCs per report page, unless the request asks for another page size
+    app.config['PER_PAGE'] = per_page
+    # Seconds between updates of the /progress event stream, and its lifetime
+    app.config['PROGRESS_INTERVAL'] = PROGRESS_INTERVAL
+    app.config['PROGRESS_TIMEOUT'] = PROGRESS_TIMEOUT
+
+    # Open /progress streams, each of them holds a server thread
+    app.extensions['progress_streams'] = StreamLimiter(max_streams)
+
+    # The test run databases in the results dir, rescanned when the directory changes
+    app.extensions['run_catalog'] = RunCatalog(results_dir, poll_interval=scan_interval)
+
+    # The files below the artifact root, rescanned when a directory changes
+    app.extensions['artifact_manifest'] = ArtifactManifest(app.config['ARTIFACT_ROOT'],
+                                                           poll_interval=scan_interval)
+
+    # In-memory cache of loaded test runs, shared by all requests
+    app.extensions['run_cache'] = LRUCache(max_bytes=cache_mb * 1024 * 1024)
+
+    # Cache of rendered exports and page fragments, e.g. LaTeX and HTML failure rate tables
+    app.extensions['export_cache'] = LRUCache(max_bytes=EXPORT_CACHE_MB * 1024 * 1024)
+
+    # Cache of the sorted row positions per selection and filters
+    app.extensions['result_cache'] = LRUCache(max_bytes=RESULT_CACHE_MB * 1024 * 1024)
+
+    # Cache of rendered and compressed report pages by ETag, a budget of 0 disables it
+    app.extensions['page_cache'] = LRUCache(max_bytes=page_cache_mb * 1024 * 1024)
+
     # Register your blueprint
-    from app.routes import bp  # pylint: disable=import-outside-toplevel
+    # pylint: disable=import-outside-toplevel
+    from app.api import api
+    from app.images import images
+    from app.routes import bp
     app.register_blueprint(bp)
+    app.register_blueprint(api)
+    app.register_blueprint(images)
 
     return app
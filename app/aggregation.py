@@ -0,0 +1,85 @@
+import pandas as pd
+
+GROUP_COLUMNS = ["mr_name", "sut_name"]
+
+
+def compute_counters(df):
+    # count failed and total (non-skipped) test cases per (mr_name, sut_name)
+    df = df.loc[df['test_result'] != 'skipped', GROUP_COLUMNS + ['test_result']]
+    failed = (df['test_result'] == 'failed').astype('int64')
+    counters = failed.groupby([df[col] for col in GROUP_COLUMNS], observed=True).agg(
+        ['sum', 'size'])
+    counters.columns = ['failed', 'total']
+    # categorical names are grouped by their codes, the counters of test runs with other
+    # categories are merged by name and sorted like names
+    counters.index = counters.index.set_levels(
+        [level.astype(object) for level in counters.index.levels])
+    return counters.astype('int64').sort_index()
+
+
+def merge_counters(counters_list):
+    # counters of several test runs are merged by adding them up per group
+    counters_list = [counters for counters in counters_list if not counters.empty]
+    if not counters_list:
+        return pd.DataFrame(
+            {'failed': [], 'total': []}, dtype='int64',
+            index=pd.MultiIndex.from_tuples([], names=GROUP_COLUMNS))
+    if len(counters_list) == 1:
+        return counters_list[0]
+    return pd.concat(counters_list).groupby(level=GROUP_COLUMNS, observed=True).sum()
+
+
+def compute_result_counts(df):
+    # number of MTCs per test result and their summed duration, these add up across test
+    # runs and across the rows appended to a live test run
+    counts = df['test_result'].value_counts()
+    return pd.Series({
+        'total': len(df),
+        'passed': counts.get('passed', 0),
+        'failed': counts.get('failed', 0),
+        'skipped': counts.get('skipped', 0),
+        'duration': df['duration'].sum(),
+    }, dtype='float64')
+
+
+def format_failure_rate_table(counters):
+    # nothing to show if all test cases were skipped
+    if counters.empty:
+        return pd.DataFrame()
+
+    # Calculate the failure rate per group
+    failure_rate = counters['failed'] / counters['total']
+
+    # Convert the failure rate Series to a DataFrame with proper column names
+    df_fr = failure_rate.unstack()
+
+    # add average row
+    df_fr.loc['average'] = df_fr.mean()
+
+    # beauty updates
+    df_fr.columns = [col.replace('test_', '') for col in df_fr.columns]
+    df_fr.columns = [col.replace('_', ' ') for col in df_fr.columns]
+    df_fr.index = [idx.replace('_', ' ') for idx in df_fr.index]
+    df_fr = (df_fr * 100).round(2).astype(str) + '%'
+    df_fr = df_fr.replace('nan%', '-')
+    return df_fr
+
+
+def counters_from_groups(groups):
+    # failure counters from per (mr_name, sut_name, test_result) counts of one or more runs
+    groups = groups.loc[groups['test_result'] != 'skipped']
+    failed = groups['count'].where(groups['test_result'] == 'failed', 0)
+    counters = pd.DataFrame({'failed': failed, 'total': groups['count']}).groupby(
+        [groups[col] for col in GROUP_COLUMNS], observed=True).sum()
+    return counters.astype('int64')
+
+
+def metadata_from_groups(groups):
+    # total, passed, failed, skipped and duration from per-group counts
+    counts = groups.groupby('test_result')['count'].sum()
+    total = int(counts.sum())
+    passed = int(counts.get('passed', 0))
+    failed = int(counts.get('failed', 0))
+    skipped = int(counts.get('skipped', 0))
+    duration = round(groups['duration'].sum(), 2)
+    return total, passed, failed, skipped, duration
@@ -0,0 +1,174 @@
+import importlib.util
+import json
+
+import pandas as pd
+from flask import Blueprint, Response, current_app, request
+
+from app.aggregation import counters_from_groups, merge_counters, metadata_from_groups
+from app.catalog import RunNotFoundError
+from app.export import df_to_rows
+from app.loader import MtcNotFoundError, get_mtc_artifacts, get_run_path
+from app.query import query_groups, query_keyset
+from app.routes import (get_column_args, get_filter_args, get_filtered_positions,
+                        get_match_ids, get_most_recent_run_name, get_test_run_args)
+from app.runset import get_cursor, get_cursor_start
+from app.state import (find_test_case, get_current_test_runs, get_query_runs, get_run_set,
+                       select_test_runs)
+
+# orjson encodes large responses several times faster than the json module
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+
+# Number of MTCs per page of /api/filter, by default and at most
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+# Separates the values of the inputs and outputs of an MTC in the database
+VALUE_SEPARATOR = "__\n\r__"
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+class ApiError(Exception):
+    """
+    Invalid arguments of an API request, answered with a JSON error message.
+    """
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return json_response({'error': str(error)}, status=400)
+
+
+@api.errorhandler(MtcNotFoundError)
+@api.errorhandler(RunNotFoundError)
+def handle_not_found(error):
+    return json_response({'error': str(error)}, status=404)
+
+
+def json_response(data, status=200):
+    if ORJSON_AVAILABLE:
+        import orjson  # pylint: disable=import-outside-toplevel
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+
+def encode_cursor(cursor):
+    return None if cursor is None else '.'.join(str(value) for value in cursor)
+
+
+def decode_cursor(value, num_runs):
+    # cursors are "<relation_order>.<run index>.<_id>" strings returned by a previous page
+    if not value:
+        return None
+    try:
+        relation_order, run_index, test_case_id = (int(part) for part in value.split('.'))
+    except ValueError as error:
+        raise ApiError(f"Invalid cursor {value!r}") from error
+    if not 0 <= run_index < num_runs:
+        raise ApiError(f"Invalid cursor {value!r}")
+    return relation_order, run_index, test_case_id
+
+
+def get_columns():
+    try:
+        return get_column_args()
+    except ValueError as error:
+        raise ApiError(str(error)) from error
+
+
+def get_limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def counters_to_json(counters):
+    return [{'mr_name': mr_name, 'sut_name': sut_name, 'failed': failed, 'total': total,
+             'failure_rate': failed / total if total else None}
+            for (mr_name, sut_name), (failed, total)
+            in zip(counters.index, counters[['failed', 'total']].to_numpy().tolist())]
+
+
+@api.route('/test_runs', methods=['GET'])
+def test_runs():
+    run_catalog = current_app.extensions['run_catalog']
+    return json_response({'test_runs': run_catalog.get_sorted_files()})
+
+
+@api.route('/select', methods=['GET'])
+def select_test_run():
+    # select test runs like /select and return the summary of the report
+    selected_test_runs = request.args.getlist('test_run') or [get_most_recent_run_name()]
+    select_test_runs(selected_test_runs)
+
+    if current_app.config['QUERY_MODE'] == 'sql':
+        groups = pd.concat([query_groups(query_path) for _, query_path
+                            in get_query_runs(selected_test_runs)])
+        metadata = metadata_from_groups(groups)
+        counters = counters_from_groups(groups)
+    else:
+        run_set = get_run_set(selected_test_runs)
+        metadata = run_set.metadata
+        counters = merge_counters([run.counters for run in run_set.runs])
+
+    total, passed, failed, skipped, duration = metadata
+    return json_response({
+        'test_runs': selected_test_runs,
+        'counters': {'total': total, 'passed': passed, 'failed': failed, 'skipped': skipped,
+                     'duration': float(duration)},
+        'failure_rates': counters_to_json(counters),
+    })
+
+
+@api.route('/filter', methods=['GET'])
+def filter_test_cases():
+    """
+    The filtered MTCs of the given or selected test runs, in the order of the report and
+    with the same filter arguments as /filter. Pages are continued with the next_cursor
+    of the previous page, which stays cheap for deep pages.
+    """
+    selected_test_runs = get_test_run_args() or get_current_test_runs()
+    filters = get_filter_args()
+    columns = get_columns()
+    limit = get_limit()
+    cursor = decode_cursor(request.args.get('cursor'), len(selected_test_runs))
+
+    if current_app.config['QUERY_MODE'] == 'sql':
+        runs = get_query_runs(selected_test_runs)
+        df, total, next_cursor = query_keyset(runs, filters,
+                                              current_app.config['SEARCH_COLUMNS'],
+                                              [col for col in columns if col != 'test_run'],
+                                              cursor, limit, get_match_ids(runs, filters))
+    else:
+        run_set = get_run_set(selected_test_runs)
+        positions = get_filtered_positions(run_set, filters)
+        start = 0 if cursor is None else get_cursor_start(run_set, positions, cursor)
+        page_positions = positions[start:start + limit]
+        df = run_set.df.iloc[page_positions][columns]
+        total = len(positions)
+        next_cursor = None
+        if start + limit < len(positions):
+            next_cursor = get_cursor(run_set, page_positions[-1])
+
+    return json_response({
+        'total': total,
+        'columns': columns,
+        'rows': df_to_rows(df[columns]),
+        'next_cursor': encode_cursor(next_cursor),
+    })
+
+
+@api.route('/mtc_detail_view/<int:test_case_id>', methods=['GET'])
+def mtc_detail_view(test_case_id):
+    # the summary columns and the artifacts of one MTC
+    test_run, row = find_test_case(request.args.get('test_run'), test_case_id)
+    artifacts = get_mtc_artifacts(get_run_path(current_app.config['DIR'], test_run),
+                                  test_case_id)
+    for value_type in ['source_inputs', 'followup_inputs', 'source_outputs',
+                       'followup_outputs']:
+        artifacts[value_type] = artifacts[value_type].split(VALUE_SEPARATOR)
+
+    return json_response(dict(row, test_run=test_run, **artifacts))
@@ -0,0 +1,109 @@
+import os
+import posixpath
+import threading
+import time
+
+from app.catalog import MTIME_RESOLUTION
+
+
+def get_default_artifact_root():
+    # visualizers write their files to app/static below the directory pytest ran in
+    return os.path.join(os.getcwd(), "app", "static")
+
+
+def get_file_version(stat):
+    # changes whenever a file is rewritten, used in URLs and ETags of artifacts
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def normalize_artifact_path(value):
+    # artifact values are paths relative to the artifact root, e.g. 'img/input_1.png'
+    path = posixpath.normpath(value)
+    if path.startswith(('/', '../')) or path in ('.', '..'):
+        return None
+    return path
+
+
+class ArtifactManifest:
+    """
+    The files below the artifact root, e.g. the images written by visualizers, and their
+    versions, kept in memory so that the detail view can tell artifact paths from plain
+    values without a stat per value. Every directory is only listed again when its mtime
+    changed, which is checked at most every poll_interval seconds.
+    """
+
+    def __init__(self, root, poll_interval=2.0):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._dirs = {}
+        self._files = {}
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    def _scan_dir(self, rel_dir, dirs):
+        # the file names and subdirectories of one directory, listed again only if changed
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+
+        cached = self._dirs.get(rel_dir)
+        if (cached is not None and cached[0] == mtime_ns
+                and time.time() - mtime_ns / 1e9 > MTIME_RESOLUTION):
+            dirs[rel_dir] = cached
+            changed = False
+        else:
+            files, sub_dirs = {}, []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            sub_dirs.append(entry.name)
+                        elif entry.is_file():
+                            files[entry.name] = get_file_version(entry.stat())
+            except OSError:
+                return False
+            dirs[rel_dir] = (mtime_ns, files, sorted(sub_dirs))
+            changed = cached is None or cached[1:] != dirs[rel_dir][1:]
+
+        for sub_dir in dirs[rel_dir][2]:
+            changed |= self._scan_dir(posixpath.join(rel_dir, sub_dir) if rel_dir else sub_dir,
+                                      dirs)
+        return changed
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < self.poll_interval:
+            return
+        self._last_check = now
+
+        dirs = {}
+        changed = self._scan_dir("", dirs)
+        if changed or dirs.keys() != self._dirs.keys():
+            self._files = {posixpath.join(rel_dir, name) if rel_dir else name: version
+                           for rel_dir, (_, files, _) in dirs.items()
+                           for name, version in files.items()}
+        self._dirs = dirs
+
+    def invalidate(self):
+        # check all directories again on the next access
+        with self._lock:
+            self._last_check = None
+
+    def get_version(self, value):
+        # version of the file named by the value, None if it is not a file below the root
+        path = normalize_artifact_path(value)
+        if path is None:
+            return None
+        with self._lock:
+            self._refresh()
+            return self._files.get(path)
+
+    def contains(self, value):
+        return self.get_version(value) is not None
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._files)
@@ -0,0 +1,143 @@
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# The columnar cache uses the Arrow IPC (feather) format, which requires pyarrow
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+CACHE_SUFFIX = ".feather"
+
+
+def get_default_cache_dir(results_dir):
+    # the cache lives next to the results dir, so it never shows up as a test run
+    results_dir = Path(results_dir)
+    return results_dir.parent / f"{results_dir.name}_cache"
+
+
+def get_run_key(db_path):
+    # finished test runs never change, so name, size and mtime identify the content
+    stat = os.stat(db_path)
+    return Path(db_path).name, stat.st_size, stat.st_mtime_ns
+
+
+def get_cache_path(cache_dir, db_path, suffix=CACHE_SUFFIX):
+    name, size, mtime_ns = get_run_key(db_path)
+    return Path(cache_dir) / f"{name}-{size}-{mtime_ns}{suffix}"
+
+
+def remove_stale_entries(cache_path, db_path, suffix=CACHE_SUFFIX):
+    # remove cache entries of older versions of the same database
+    for stale_path in cache_path.parent.glob(f"{Path(db_path).name}-*{suffix}"):
+        if stale_path != cache_path:
+            stale_path.unlink()
+
+
+def get_tmp_path(cache_path):
+    # cache entries are written to a temporary file first and then moved into place,
+    # so readers never see a partial entry
+    return cache_path.with_name(
+        f".{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def read_cached_run(cache_dir, db_path):
+    if not cache_dir or not ARROW_AVAILABLE:
+        return None
+
+    cache_path = get_cache_path(cache_dir, db_path)
+    if not cache_path.exists():
+        return None
+
+    from pyarrow import feather  # pylint: disable=import-outside-toplevel
+
+    try:
+        return feather.read_feather(cache_path, memory_map=True)
+    except (OSError, ValueError):
+        # a broken cache file is not fatal, the run is read from the database again
+        return None
+
+
+def write_cached_run(cache_dir, db_path, df):
+    if not cache_dir or not ARROW_AVAILABLE:
+        return
+
+    cache_path = get_cache_path(cache_dir, db_path)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        remove_stale_entries(cache_path, db_path)
+
+        tmp_path = get_tmp_path(cache_path)
+        # uncompressed, so that memory mapped reads use the file pages without a copy
+        df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError, TypeError):
+        # caching is best effort, the report works without it
+        return
+
+
+def estimate_df_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class LRUCache:
+    """
+    Keeps recently used values, e.g. loaded test runs, in memory. The least recently used
+    values are evicted once the estimated size of all cached values exceeds max_bytes.
+    A value that holds on to other cached values, e.g. a run set to its test runs, is put
+    with their keys as depends_on and is evicted together with any of them, so that
+    evicted values are never kept alive without being counted.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._values = OrderedDict()
+        self._dependents = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._values:
+                return None
+            self._values.move_to_end(key)
+            return self._values[key][0]
+
+    def put(self, key, value, nbytes, depends_on=()):
+        with self._lock:
+            self._remove(key)
+
+            # values larger than the whole budget are not cached at all, neither are
+            # values whose dependencies are not cached
+            if nbytes > self.max_bytes or any(dep not in self._values for dep in depends_on):
+                return
+
+            self._values[key] = (value, nbytes, tuple(depends_on))
+            self._size += nbytes
+            for dep in depends_on:
+                self._dependents.setdefault(dep, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._values)))
+
+    def _remove(self, key):
+        # remove a value and everything that depends on it
+        if key not in self._values:
+            return
+        _, nbytes, depends_on = self._values.pop(key)
+        self._size -= nbytes
+        for dep in depends_on:
+            self._dependents.get(dep, set()).discard(key)
+        for dependent in self._dependents.pop(key, set()):
+            self._remove(dependent)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._values
+
+    def __len__(self):
+        with self._lock:
+            return len(self._values)
+
+    @property
+    def size(self):
+        return self._size
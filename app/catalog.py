@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+# gemtest names its databases after the start of the test run
+RUN_NAME_PATTERN = re.compile(
+    r"^metamorphic_test_run_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.db$")
+
+# Coarsest directory mtime resolution we expect (e.g. FAT or some network file systems)
+MTIME_RESOLUTION = 2.0
+
+
+class RunNotFoundError(LookupError):
+    """
+    The requested test run is not a test run database of the results directory.
+    """
+
+
+def extract_datetime_from_filename(file_name):
+    # datetime of the test execution, None for files that are not test run databases
+    match = RUN_NAME_PATTERN.match(file_name)
+    if match is None:
+        return None
+    try:
+        return datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S")
+    except ValueError:
+        return None
+
+
+class RunCatalog:
+    """
+    The test run databases in the results directory, newest first. The directory is only
+    listed again when its mtime changed, which is checked at most every poll_interval
+    seconds, and only the names of new files are parsed.
+    """
+
+    def __init__(self, results_dir, poll_interval=2.0):
+        self.results_dir = results_dir
+        self.poll_interval = poll_interval
+        self._run_dates = {}
+        self._sorted_runs = []
+        self._dir_mtime_ns = None
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < self.poll_interval:
+            return
+        self._last_check = now
+
+        try:
+            dir_mtime_ns = os.stat(self.results_dir).st_mtime_ns
+        except OSError:
+            dir_mtime_ns = None
+        # like git's racy-clean check: on file systems with a coarse mtime resolution, a
+        # directory modified within the last seconds may still change without a new mtime
+        if (dir_mtime_ns is not None and dir_mtime_ns == self._dir_mtime_ns
+                and time.time() - dir_mtime_ns / 1e9 > MTIME_RESOLUTION):
+            return
+        self._dir_mtime_ns = dir_mtime_ns
+
+        run_dates = {}
+        if dir_mtime_ns is not None:
+            with os.scandir(self.results_dir) as entries:
+                for entry in entries:
+                    if entry.name in self._run_dates:
+                        run_dates[entry.name] = self._run_dates[entry.name]
+                        continue
+                    run_date = extract_datetime_from_filename(entry.name)
+                    if run_date is not None and entry.is_file():
+                        run_dates[entry.name] = run_date
+
+        self._run_dates = run_dates
+        self._sorted_runs = sorted(run_dates, key=run_dates.get, reverse=True)
+
+    def invalidate(self):
+        # list the directory again on the next access
+        with self._lock:
+            self._last_check = None
+            self._dir_mtime_ns = None
+
+    def get_sorted_files(self):
+        with self._lock:
+            self._refresh()
+            return list(self._sorted_runs)
+
+    def has_run(self, test_run):
+        # a test run written since the last listing is found by listing the directory again,
+        # names that are no test run databases, e.g. paths, are never looked up
+        with self._lock:
+            self._refresh()
+            if test_run in self._run_dates:
+                return True
+            if (not test_run or extract_datetime_from_filename(test_run) is None
+                    or not os.path.isfile(os.path.join(self.results_dir, test_run))):
+                return False
+            self._last_check = None
+            self._dir_mtime_ns = None
+            self._refresh()
+            return test_run in self._run_dates
+
+    def get_most_recent_run_name(self):
+        with self._lock:
+            self._refresh()
+            return self._sorted_runs[0] if self._sorted_runs else None
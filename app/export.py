@@ -0,0 +1,102 @@
+import pandas as pd
+
+from app.aggregation import format_failure_rate_table, merge_counters
+from app.cache import ARROW_AVAILABLE
+
+# Number of MTCs converted at once by the bulk exports, bounds their memory use
+EXPORT_CHUNK_SIZE = 10000
+
+# Bulk export formats and their mimetypes
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def get_failure_rate_table(runs):
+    return format_failure_rate_table(merge_counters([run.counters for run in runs]))
+
+
+def failure_rate_table_to_latex(df_fr):
+    return df_fr.style.to_latex(hrules=True)
+
+
+def get_failure_rate_latex(runs, export_cache=None):
+    # the LaTeX table only depends on the contents of the selected test runs
+    cache_key = ('latex',) + tuple(run.key for run in runs)
+    if export_cache is not None:
+        latex = export_cache.get(cache_key)
+        if latex is not None:
+            return latex
+
+    latex = failure_rate_table_to_latex(get_failure_rate_table(runs))
+
+    if export_cache is not None:
+        export_cache.put(cache_key, latex, len(latex))
+    return latex
+
+
+def widen_floats(df):
+    # float32 columns as float64, the JSON encoders and the export schema expect doubles
+    columns = [col for col in df.columns if df[col].dtype == 'float32']
+    if not columns:
+        return df
+    return df.assign(**{col: df[col].astype('float64') for col in columns})
+
+
+def df_to_rows(df):
+    # rows as lists, missing values become null
+    df = widen_floats(df)
+    return df.astype(object).where(df.notna(), None).to_numpy().tolist()
+
+
+def iter_run_set_chunks(run_set, positions, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    # the rows of the run set at the given positions, as DataFrames of chunk_size rows
+    for start in range(0, len(positions), chunk_size):
+        yield widen_floats(run_set.df.iloc[positions[start:start + chunk_size]][columns])
+
+
+def iter_csv(chunks, columns):
+    # the header is written on its own, so that an export without MTCs still has one
+    yield pd.DataFrame(columns=columns).to_csv(index=False)
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=False)
+
+
+def iter_ndjson(chunks):
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        # older pandas versions omit the newline after the last record
+        lines = chunk.to_json(orient='records', lines=True, force_ascii=False,
+                              double_precision=15)
+        yield lines if lines.endswith("\n") else lines + "\n"
+
+
+def get_arrow_schema(columns):
+    # a fixed schema, the types inferred from a single chunk may differ between chunks
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    types = {'_id': pa.int64(), 'relation_result': pa.bool_(), 'duration': pa.float64()}
+    return pa.schema([(col, types.get(col, pa.string())) for col in columns])
+
+
+def write_parquet(chunks, columns, file):
+    """
+    Write the chunks to a Parquet file, one row group per chunk, so that only one chunk
+    is held in memory at a time.
+    """
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("The Parquet export requires pyarrow, "
+                           "install it with 'pip install gemtest-webapp[cache]'")
+
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    from pyarrow import parquet
+
+    schema = get_arrow_schema(columns)
+    with parquet.ParquetWriter(file, schema) as writer:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
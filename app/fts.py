@@ -0,0 +1,76 @@
+import os
+import sqlite3
+
+from app.cache import get_cache_path, get_tmp_path, remove_stale_entries
+from app.loader import ARTIFACT_COLUMNS
+
+FTS_SUFFIX = ".fts.db"
+
+# The trigram tokenizer answers case-insensitive substring queries of 3+ characters
+MIN_FTS_QUERY_LENGTH = 3
+
+
+def build_fts_index(db_path, cache_dir):
+    # write a contentless FTS5 sidecar database that maps artifact text to MTC ids
+    fts_path = get_cache_path(cache_dir, db_path, FTS_SUFFIX)
+    if fts_path.exists():
+        return fts_path
+
+    fts_path.parent.mkdir(parents=True, exist_ok=True)
+    remove_stale_entries(fts_path, db_path, FTS_SUFFIX)
+
+    tmp_path = get_tmp_path(fts_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        columns = ', '.join(ARTIFACT_COLUMNS)
+        conn.execute(f"CREATE VIRTUAL TABLE mtc_fts USING fts5({columns}, "  # nosec
+                     f"tokenize='trigram', content='')")
+        conn.execute("ATTACH DATABASE ? AS run", (str(db_path),))
+        conn.execute(f"INSERT INTO mtc_fts(rowid, {columns}) "  # nosec
+                     f"SELECT _id, {columns} FROM run.mtc_results")
+        conn.commit()
+        conn.execute("DETACH DATABASE run")
+    except sqlite3.Error:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, fts_path)
+    return fts_path
+
+
+def _search_fts(fts_path, substring):
+    conn = sqlite3.connect(fts_path)
+    try:
+        # quote the substring as an FTS5 phrase so that it is matched literally
+        phrase = '"' + substring.replace('"', '""') + '"'
+        rows = conn.execute("SELECT rowid FROM mtc_fts WHERE mtc_fts MATCH ?",
+                            (phrase,)).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def _search_db(db_path, substring):
+    # fallback without an index: a LIKE scan inside SQLite, the text never reaches Python
+    conn = sqlite3.connect(db_path)
+    try:
+        pattern = '%' + substring.replace('\\', '\\\\').replace('%', '\\%').replace(
+            '_', '\\_') + '%'
+        condition = ' OR '.join(f"{col} LIKE ? ESCAPE '\\'" for col in ARTIFACT_COLUMNS)
+        rows = conn.execute(f"SELECT _id FROM mtc_results WHERE {condition}",  # nosec
+                            [pattern] * len(ARTIFACT_COLUMNS)).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def search_artifacts(db_path, cache_dir, substring):
+    # ids of the MTCs whose stdout, stderr, inputs or outputs contain the substring
+    if len(substring) >= MIN_FTS_QUERY_LENGTH and cache_dir:
+        try:
+            return _search_fts(build_fts_index(db_path, cache_dir), substring)
+        except (sqlite3.Error, OSError):
+            pass
+    return _search_db(db_path, substring)
@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+import importlib.metadata
+import importlib.util
+
+# Brotli compresses HTML better than gzip, it is used when installed and accepted
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Smaller responses are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+def get_app_version():
+    # a new release may render the same data differently
+    try:
+        return importlib.metadata.version("gemtest-webapp")
+    except importlib.metadata.PackageNotFoundError:
+        return "dev"
+
+
+def get_etag(*parts):
+    # a stable hash of everything a response depends on
+    return hashlib.sha256(repr((get_app_version(),) + parts).encode()).hexdigest()[:32]
+
+
+def choose_encoding(accept_encodings):
+    # the best content encoding the client accepts, None for uncompressed responses
+    if BROTLI_AVAILABLE and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        import brotli  # pylint: disable=import-outside-toplevel
+        return brotli.compress(data, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def compress_response(response, accept_encodings):
+    """
+    Compress an HTML response in place, unless it is streamed, already encoded or too
+    small to benefit.
+    """
+    if (response.status_code != 200 or response.mimetype != 'text/html'
+            or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,93 @@
+import hashlib
+import importlib.util
+import os
+from pathlib import Path
+
+from flask import Blueprint, abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from app.artifacts import get_file_version
+from app.cache import get_tmp_path
+
+# Thumbnails are generated with Pillow, without it the full images are served
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Edge length of thumbnails in pixels, twice the size shown in the detail view
+THUMBNAIL_SIZE = 200
+
+# Artifact URLs carry the version of the file, such responses never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+images = Blueprint('images', __name__)
+
+
+def get_thumbnail_path(cache_dir, file_path, version, size=THUMBNAIL_SIZE):
+    # a new version of the image gets a new thumbnail instead of a stale one
+    digest = hashlib.sha256(f"{file_path}\x00{version}\x00{size}".encode()).hexdigest()
+    return Path(cache_dir) / "thumbnails" / f"{digest}.png"
+
+
+def create_thumbnail(file_path, thumbnail_path, size=THUMBNAIL_SIZE):
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = get_tmp_path(thumbnail_path)
+    try:
+        with Image.open(file_path) as image:
+            image.thumbnail((size, size))
+            image.save(tmp_path, format="PNG")
+    except (OSError, ValueError):
+        # not an image or not convertible to PNG, the file itself is served instead
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
+    os.replace(tmp_path, thumbnail_path)
+    return True
+
+
+def resolve_artifact(filename):
+    # path and version of a file below the artifact root, 404 for anything else
+    file_path = safe_join(current_app.config['ARTIFACT_ROOT'], filename)
+    if file_path is None:
+        abort(404)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        abort(404)
+    if not os.path.isfile(file_path):
+        abort(404)
+    return file_path, get_file_version(stat)
+
+
+def send_versioned_file(file_path, version, etag):
+    """
+    Send a file with support for conditional and range requests. When the request asks
+    for the current version of the artifact, browsers may cache the response forever,
+    otherwise they have to revalidate it with the ETag.
+    """
+    response = send_file(file_path, etag=etag, conditional=True)
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = "no-cache"
+    return response
+
+
+@images.route('/artifacts/<path:filename>')
+def artifact(filename):
+    file_path, version = resolve_artifact(filename)
+    return send_versioned_file(file_path, version, version)
+
+
+@images.route('/thumbnails/<path:filename>')
+def thumbnail(filename):
+    # thumbnails are generated on first request and cached on disk
+    file_path, version = resolve_artifact(filename)
+    if not PIL_AVAILABLE:
+        return send_versioned_file(file_path, version, version)
+
+    thumbnail_path = get_thumbnail_path(current_app.config['CACHE_DIR'], file_path, version)
+    if not thumbnail_path.exists() and not create_thumbnail(file_path, thumbnail_path):
+        return send_versioned_file(file_path, version, version)
+    return send_versioned_file(thumbnail_path, version, f"{version}-{THUMBNAIL_SIZE}")
@@ -0,0 +1,197 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from app.aggregation import compute_counters, compute_result_counts, merge_counters
+from app.cache import estimate_df_bytes, get_run_key, read_cached_run, write_cached_run
+from app.search import ChunkedSearchIndex, SearchIndex
+
+# Columns needed to render the report tables, filters and failure rates
+SUMMARY_COLUMNS = ["_id", "mtc_name", "mr_name", "sut_name", "transformation_name",
+                   "relation_name", "parameters", "test_result", "relation_result",
+                   "duration"]
+
+# Large text columns that are only shown in the MTC detail view
+ARTIFACT_COLUMNS = ["source_inputs", "followup_inputs", "source_outputs",
+                    "followup_outputs", "stdout", "stderr"]
+
+# Compact dtypes of the summary columns. Names and results repeat on every row of a test
+# run, as categoricals a row only stores a small code instead of a Python string. Durations
+# stay float64 like in the database, so both query modes report the same values.
+SUMMARY_DTYPES = {"mr_name": "category", "sut_name": "category",
+                  "transformation_name": "category", "relation_name": "category",
+                  "test_result": "category", "relation_result": "boolean"}
+
+
+class MtcNotFoundError(LookupError):
+    """
+    The requested MTC is not part of the test run or of the selected test runs.
+    """
+
+
+@dataclass
+class LoadedRun:
+    """
+    A test run loaded into memory: the summary DataFrame and the per-run aggregates
+    and indexes that are computed once when the run is loaded.
+    """
+    name: str
+    key: tuple
+    df: pd.DataFrame
+    counters: pd.DataFrame
+    result_counts: pd.Series
+    search_index: SearchIndex
+    id_index: pd.Index
+
+    @property
+    def nbytes(self):
+        return estimate_df_bytes(self.df) + self.search_index.nbytes + self.id_index.nbytes
+
+    def memory_usage(self):
+        # bytes per column of the loaded DataFrame and of the indexes of the run
+        usage = self.df.memory_usage(index=False, deep=True)
+        usage['search_index'] = self.search_index.nbytes
+        usage['id_index'] = self.id_index.nbytes
+        return usage
+
+    @property
+    def high_water_mark(self):
+        # largest _id loaded so far, gemtest writes the MTCs of a run with increasing ids
+        return int(self.id_index.max()) if len(self.id_index) else -1
+
+
+def get_run_path(folder_path, test_run):
+    return os.path.join(os.getcwd(), folder_path, test_run)
+
+
+def get_test_results_df(conn, after_id=None):
+    # only read the summary columns, artifacts are fetched per MTC on demand
+    query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM mtc_results"  # nosec
+    params = ()
+    if after_id is not None:
+        # only the rows written after the given _id
+        query += " WHERE _id > ? ORDER BY _id"
+        params = (after_id,)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    df = pd.DataFrame(rows, columns=[desc[0] for desc in cursor.description])
+    df['relation_result'] = df['relation_result'].map({'True': True, 'False': False})
+    return apply_summary_dtypes(df)
+
+
+def apply_summary_dtypes(df):
+    # convert the columns that are not stored compactly yet, e.g. in older cache files
+    dtypes = {col: dtype for col, dtype in SUMMARY_DTYPES.items()
+              if col in df.columns and df[col].dtype != dtype}
+    return df.astype(dtypes) if dtypes else df
+
+
+def add_test_run_column(df, test_run):
+    # the name of the test run is the same on every row, a categorical stores it once
+    df['test_run'] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8),
+                                               categories=[test_run])
+    return df
+
+
+def concat_summary_dfs(dfs):
+    """
+    Concatenate the DataFrames of several test runs, or of a live test run and its new
+    rows. Categoricals with different categories would be concatenated as objects, so
+    the categories of every categorical column are unified first.
+    """
+    dfs = list(dfs)
+    for col in dfs[0].columns:
+        if not all(isinstance(df[col].dtype, pd.CategoricalDtype) for df in dfs):
+            continue
+        categories = pd.Index(np.concatenate([df[col].cat.categories for df in dfs])).unique()
+        dfs = [df.assign(**{col: df[col].cat.set_categories(categories)}) for df in dfs]
+    return pd.concat(dfs, ignore_index=True)
+
+
+def load_test_run(db_path, test_run, cache_dir=None, search_columns=tuple(SUMMARY_COLUMNS)):
+    run_key = get_run_key(db_path)
+    df = read_cached_run(cache_dir, db_path)
+    if df is None:
+        conn = sqlite3.connect(db_path)
+        try:
+            df = get_test_results_df(conn)
+        finally:
+            conn.close()
+        write_cached_run(cache_dir, db_path, df)
+    df = add_test_run_column(apply_summary_dtypes(df), test_run)
+    return LoadedRun(name=test_run, key=run_key, df=df, counters=compute_counters(df),
+                     result_counts=compute_result_counts(df),
+                     search_index=SearchIndex(df, search_columns),
+                     id_index=pd.Index(df['_id']))
+
+
+def tail_test_run(loaded_run, db_path, search_columns=tuple(SUMMARY_COLUMNS)):
+    """
+    Bring a test run that is still being written up to date. Only the rows above the high
+    water mark are read, and the counters of the new rows are added to the loaded ones.
+    """
+    run_key = get_run_key(db_path)
+    if run_key[1] < loaded_run.key[1]:
+        # the database shrank, so it was replaced rather than appended to
+        return load_test_run(db_path, loaded_run.name, search_columns=search_columns)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        new_df = get_test_results_df(conn, after_id=loaded_run.high_water_mark)
+    finally:
+        conn.close()
+    if new_df.empty:
+        # the database changed without new MTCs, e.g. a journal was checkpointed
+        return replace(loaded_run, key=run_key)
+    new_df = add_test_run_column(new_df, loaded_run.name)
+    df = concat_summary_dfs([loaded_run.df, new_df])
+
+    search_index = loaded_run.search_index
+    if not isinstance(search_index, ChunkedSearchIndex):
+        search_index = ChunkedSearchIndex([search_index])
+
+    return LoadedRun(
+        name=loaded_run.name,
+        key=run_key,
+        df=df,
+        counters=merge_counters([loaded_run.counters, compute_counters(new_df)]),
+        result_counts=loaded_run.result_counts + compute_result_counts(new_df),
+        search_index=search_index.append(df, search_columns),
+        id_index=loaded_run.id_index.append(pd.Index(new_df['_id'])),
+    )
+
+
+def load_test_runs(runs, cache_dir=None, max_workers=None,
+                   search_columns=tuple(SUMMARY_COLUMNS)):
+    # runs is a list of (db_path, test_run) tuples, the loaded runs keep their order
+    def load(run):
+        return load_test_run(run[0], run[1], cache_dir, search_columns)
+
+    if len(runs) <= 1 or max_workers == 1:
+        return [load(run) for run in runs]
+
+    # the databases are independent, sqlite and pyarrow release the GIL while reading
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(load, runs))
+
+
+def get_mtc_artifacts(db_path, test_case_id):
+    # fetch the heavy artifact columns of a single MTC
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(ARTIFACT_COLUMNS)} FROM mtc_results WHERE _id = ?",  # nosec
+            (test_case_id,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+
+    if row is None:
+        raise MtcNotFoundError(f"MTC {test_case_id} not found in {db_path}")
+    return dict(zip(ARTIFACT_COLUMNS, row))
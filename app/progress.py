@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+
+# Seconds between keep-alive comments on an idle stream, proxies close silent connections
+KEEP_ALIVE_INTERVAL = 15.0
+
+
+class StreamLimiter:
+    """
+    Counts the open progress streams. Every open stream holds a server thread, so streams
+    beyond max_streams are refused to keep threads free for report pages.
+    """
+
+    def __init__(self, max_streams):
+        self.max_streams = max_streams
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._open >= self.max_streams:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open -= 1
+
+    def __len__(self):
+        with self._lock:
+            return self._open
+
+
+def get_progress(metadata, counters):
+    # counters of the report header and the failure counters per (mr_name, sut_name)
+    total, passed, failed, skipped, duration = metadata
+    summary = {'total': total, 'passed': passed, 'failed': failed, 'skipped': skipped,
+               'duration': float(duration)}
+    groups = {group: (int(group_failed), int(group_total))
+              for group, (group_failed, group_total)
+              in zip(counters.index, counters[['failed', 'total']].to_numpy())}
+    return summary, groups
+
+
+def get_failure_rate_changes(previous_groups, groups):
+    # the groups whose failure counters changed since the previous event
+    changes = []
+    for (mr_name, sut_name), (failed, total) in groups.items():
+        if previous_groups.get((mr_name, sut_name)) != (failed, total):
+            changes.append({'mr_name': mr_name, 'sut_name': sut_name, 'failed': failed,
+                            'total': total, 'failure_rate': failed / total if total else None})
+    return changes
+
+
+def format_event(data, event='progress'):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_progress(get_snapshot, interval, timeout):
+    """
+    Server-sent events with the progress of the selected test runs. get_snapshot returns
+    a key that changes whenever the test runs change, their metadata and their failure
+    counters. An event is only sent when the key changed; the first event contains all
+    groups, later events only the groups whose failure rates changed. The stream ends
+    after timeout seconds and the browser reconnects, so a stream never holds a server
+    thread forever.
+    """
+    previous_key = None
+    previous_groups = {}
+    start = last_sent = time.monotonic()
+    yield f"retry: {int(interval * 1000)}\n\n"
+    while True:
+        key, metadata, counters = get_snapshot()
+        now = time.monotonic()
+        if key != previous_key:
+            summary, groups = get_progress(metadata, counters)
+            yield format_event({'counters': summary,
+                                'failure_rates': get_failure_rate_changes(previous_groups,
+                                                                          groups)})
+            previous_key, previous_groups, last_sent = key, groups, now
+        elif now - last_sent >= KEEP_ALIVE_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = now
+
+        if now - start >= timeout:
+            return
+        time.sleep(interval)
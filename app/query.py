@@ -0,0 +1,263 @@
+import os
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from app.cache import get_cache_path, get_tmp_path, remove_stale_entries
+from app.loader import SUMMARY_COLUMNS
+
+QUERY_SUFFIX = ".query.db"
+
+# Columns of the report table that can be filtered by a list of values
+FILTER_COLUMNS = ["mr_name", "sut_name", "test_result"]
+
+# Columns shown in the table of individual MTCs
+PAGE_COLUMNS = ["_id", "mtc_name", "mr_name", "sut_name", "parameters", "test_result"]
+
+# relation_result is stored as text, the sort key orders False < True < everything else
+RELATION_ORDER = "CASE relation_result WHEN 'False' THEN 0 WHEN 'True' THEN 1 ELSE 2 END"
+
+
+def build_query_db(db_path, cache_dir):
+    """
+    Write a sidecar database with the summary columns of a test run, indexes on the
+    filter and sort columns and the per-group aggregates, so that report pages can be
+    answered with SQL without loading the test run into memory.
+    """
+    query_path = get_cache_path(cache_dir, db_path, QUERY_SUFFIX)
+    if query_path.exists():
+        return query_path
+
+    query_path.parent.mkdir(parents=True, exist_ok=True)
+    remove_stale_entries(query_path, db_path, QUERY_SUFFIX)
+
+    tmp_path = get_tmp_path(query_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        columns = ', '.join(SUMMARY_COLUMNS)
+        conn.execute("ATTACH DATABASE ? AS run", (str(db_path),))
+        conn.execute(f"CREATE TABLE mtc_summary AS SELECT {columns}, "  # nosec
+                     f"{RELATION_ORDER} AS relation_order FROM run.mtc_results")
+        conn.execute("DETACH DATABASE run")
+        conn.execute("CREATE UNIQUE INDEX idx_order ON mtc_summary(relation_order, _id)")
+        conn.execute("CREATE UNIQUE INDEX idx_id ON mtc_summary(_id)")
+        for col in FILTER_COLUMNS:
+            conn.execute(f"CREATE INDEX idx_{col} ON mtc_summary({col})")  # nosec
+        conn.execute("CREATE TABLE mtc_groups AS "
+                     "SELECT mr_name, sut_name, test_result, COUNT(*) AS count, "
+                     "SUM(duration) AS duration FROM mtc_summary "
+                     "GROUP BY mr_name, sut_name, test_result")
+        conn.commit()
+    except sqlite3.Error:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, query_path)
+    return query_path
+
+
+def _connect(query_path):
+    # file URIs need an absolute path
+    return sqlite3.connect(f"{Path(query_path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def _where_clause(filters, search_columns, match_ids=None):
+    conditions = []
+    params = []
+    for col in FILTER_COLUMNS:
+        values = filters.get(col)
+        if values and values != ["all"]:
+            conditions.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+    substring = filters.get('substring')
+    if substring and match_ids is not None:
+        conditions.append("_id IN (SELECT _id FROM temp.match_ids)")
+    elif substring:
+        pattern = '%' + substring.replace('\\', '\\\\').replace('%', '\\%').replace(
+            '_', '\\_') + '%'
+        conditions.append('(' + ' OR '.join(
+            f"CAST({col} AS TEXT) LIKE ? ESCAPE '\\'" for col in search_columns) + ')')
+        params.extend([pattern] * len(search_columns))
+
+    if not conditions:
+        return "", params
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def _prepare(conn, match_ids):
+    # ids found by the artifact search are matched through a temporary table
+    if match_ids is not None:
+        conn.execute("CREATE TEMP TABLE match_ids(_id INTEGER PRIMARY KEY)")
+        conn.executemany("INSERT OR IGNORE INTO temp.match_ids VALUES (?)",
+                         ((_id,) for _id in match_ids))
+
+
+def count_rows(query_path, filters, search_columns, match_ids=None):
+    # number of filtered rows per relation_order value
+    conn = _connect(query_path)
+    try:
+        _prepare(conn, match_ids)
+        where, params = _where_clause(filters, search_columns, match_ids)
+        rows = conn.execute(
+            f"SELECT relation_order, COUNT(*) FROM mtc_summary {where} "  # nosec
+            f"GROUP BY relation_order", params).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+def fetch_rows(  # pylint: disable=too-many-arguments
+        query_path, filters, search_columns, relation_order, limit, offset, match_ids=None,
+        columns=tuple(PAGE_COLUMNS), after_id=None):
+    conn = _connect(query_path)
+    try:
+        _prepare(conn, match_ids)
+        where, params = _where_clause(filters, search_columns, match_ids)
+        where = f"{where} AND relation_order = ?" if where else "WHERE relation_order = ?"
+        params.append(relation_order)
+        if after_id is not None:
+            # keyset pagination continues after the last MTC of the previous page
+            where += " AND _id > ?"
+            params.append(after_id)
+        cursor = conn.execute(
+            f"SELECT {', '.join(columns)} FROM mtc_summary {where} "  # nosec
+            f"ORDER BY _id LIMIT ? OFFSET ?", params + [limit, offset])
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    return rows
+
+
+def get_segments(runs, filters, search_columns, match_ids):
+    """
+    The filtered MTCs of all runs in the order of the report, as (relation_order, run
+    index, test_run, query_path, count) segments: by relation_order, then by run. Only
+    the number of MTCs per segment is queried.
+    """
+    counts = {test_run: count_rows(query_path, filters, search_columns,
+                                   match_ids.get(test_run))
+              for test_run, query_path in runs}
+    relation_orders = sorted({key for run_counts in counts.values() for key in run_counts})
+    return [(relation_order, run_index, test_run, query_path, counts[test_run][relation_order])
+            for relation_order in relation_orders
+            for run_index, (test_run, query_path) in enumerate(runs)
+            if counts[test_run].get(relation_order)]
+
+
+def query_page(  # pylint: disable=too-many-arguments,too-many-locals
+        runs, filters, search_columns, page, per_page, match_ids=None):
+    """
+    Return one page of the filtered MTCs of all runs, ordered by relation_result, run and
+    _id, together with the total number of filtered MTCs. runs is a list of
+    (test_run, query_path) tuples, match_ids maps test runs to the ids found by an
+    artifact search. Only the rows of the requested page are read.
+    """
+    match_ids = match_ids or {}
+    segments = get_segments(runs, filters, search_columns, match_ids)
+
+    # walk the segments in sort order and read the page slices
+    start = (page - 1) * per_page
+    end = start + per_page
+    position = 0
+    rows = []
+    for relation_order, _, test_run, query_path, count in segments:
+        if position + count > start and position < end:
+            offset = max(start - position, 0)
+            limit = min(end, position + count) - position - offset
+            rows.extend(row + (test_run,) for row in fetch_rows(
+                query_path, filters, search_columns, relation_order, limit, offset,
+                match_ids.get(test_run)))
+        position += count
+
+    total = sum(segment[-1] for segment in segments)
+    return pd.DataFrame(rows, columns=PAGE_COLUMNS + ['test_run']), total
+
+
+def rows_to_df(rows, columns):
+    # relation_result is stored as text, like the loader map it to booleans
+    df = pd.DataFrame(rows, columns=columns)
+    if 'relation_result' in df:
+        df['relation_result'] = df['relation_result'].map({'True': True, 'False': False})
+    return df
+
+
+def query_keyset(  # pylint: disable=too-many-arguments,too-many-locals
+        runs, filters, search_columns, columns, cursor, limit, match_ids=None):
+    """
+    Return up to limit filtered MTCs of all runs that follow the cursor in the order of
+    query_page, the total number of filtered MTCs and the cursor of the next page, or
+    None on the last page. A cursor is a (relation_order, run index, _id) tuple, columns
+    must start with _id.
+    """
+    match_ids = match_ids or {}
+    segments = get_segments(runs, filters, search_columns, match_ids)
+
+    # read one MTC more than requested to know whether there is a next page
+    rows = []
+    keys = []
+    for relation_order, run_index, test_run, query_path, _ in segments:
+        segment = (relation_order, run_index)
+        if len(rows) > limit or (cursor is not None and segment < cursor[:2]):
+            continue
+        after_id = cursor[2] if cursor is not None and segment == cursor[:2] else None
+        segment_rows = fetch_rows(query_path, filters, search_columns, relation_order,
+                                  limit + 1 - len(rows), 0, match_ids.get(test_run),
+                                  columns, after_id)
+        rows.extend(row + (test_run,) for row in segment_rows)
+        keys.extend(segment + (row[0],) for row in segment_rows)
+
+    total = sum(segment[-1] for segment in segments)
+    next_cursor = keys[limit - 1] if len(rows) > limit else None
+    return rows_to_df(rows[:limit], list(columns) + ['test_run']), total, next_cursor
+
+
+def iter_query_chunks(  # pylint: disable=too-many-arguments
+        runs, filters, search_columns, columns, chunk_size, match_ids=None):
+    """
+    All filtered MTCs of the runs in the order of query_page, as DataFrames of at most
+    chunk_size rows. Every chunk continues after the last _id of the previous one, so the
+    runs are never read into memory at once. columns must start with _id.
+    """
+    match_ids = match_ids or {}
+    segments = get_segments(runs, filters, search_columns, match_ids)
+    for relation_order, _, test_run, query_path, _ in segments:
+        after_id = None
+        while True:
+            rows = fetch_rows(query_path, filters, search_columns, relation_order,
+                              chunk_size, 0, match_ids.get(test_run), columns, after_id)
+            if not rows:
+                break
+            chunk = rows_to_df(rows, columns)
+            chunk['test_run'] = test_run
+            yield chunk
+            after_id = rows[-1][0]
+
+
+def query_groups(query_path):
+    # per (mr_name, sut_name, test_result) counts and durations computed at build time
+    conn = _connect(query_path)
+    try:
+        return pd.read_sql_query("SELECT * FROM mtc_groups", conn)
+    finally:
+        conn.close()
+
+
+def query_row(query_path, test_case_id):
+    conn = _connect(query_path)
+    try:
+        cursor = conn.execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM mtc_summary WHERE _id = ?",  # nosec
+            (test_case_id,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    # like rows_to_df, relation_result as a boolean
+    row = dict(zip(SUMMARY_COLUMNS, row))
+    row['relation_result'] = {'True': True, 'False': False}.get(row['relation_result'])
+    return row
@@ -1,155 +1,268 @@
 import math
-import os
-import sqlite3
-from datetime import datetime
+import tempfile
+import time
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from flask import Blueprint, current_app, render_template, request
+from flask import (Blueprint, Response, abort, current_app, g, render_template, request,
+                   send_file, stream_with_context)
+from markupsafe import Markup
+
+from app.aggregation import (compute_counters, counters_from_groups, format_failure_rate_table,
+                             merge_counters, metadata_from_groups)
+from app.cache import get_run_key
+from app.catalog import RunNotFoundError
+from app.export import (EXPORT_CHUNK_SIZE, EXPORT_FORMATS, get_failure_rate_latex, iter_csv,
+                        iter_ndjson, iter_run_set_chunks, write_parquet)
+from app.fts import search_artifacts
+from app.http_cache import choose_encoding, compress, compress_response, get_etag
+from app.loader import SUMMARY_COLUMNS, MtcNotFoundError, get_mtc_artifacts, get_run_path
+from app.progress import stream_progress
+from app.query import PAGE_COLUMNS, iter_query_chunks, query_groups, query_page
+from app.runset import get_filter_key, get_sorted_positions
+from app.search import search_runs
+from app.state import (check_test_runs, find_test_case, get_current_test_runs, get_filters,
+                       get_query_runs, get_run_set, load_runs, select_test_runs, set_filters)
 
 bp = Blueprint('main', __name__)
 
-# Define a global variable to store the df loaded from the database
-global_df = None
-global_df_filtered = None
-current_test_runs = []
+# Number of MTCs shown per page at most, the default is set in the app config
+MAX_PER_PAGE = 1000
 
+# Number of page links shown on each side of the current page
+PAGE_WINDOW = 3
 
-def get_most_recent_run_name(folder_path):
+# Seconds after which a refused progress stream should be opened again
+RETRY_AFTER = 30
+
+
+def get_most_recent_run_name():
     # Get the most recent test_run database name
-    test_runs = [f for f in os.listdir(folder_path) if
-                 os.path.isfile(os.path.join(folder_path, f))]
-    return max(test_runs, key=extract_datetime_from_filename)
+    return current_app.extensions['run_catalog'].get_most_recent_run_name()
 
 
-def extract_datetime_from_filename(file_name):
-    # function to extract the datetime of the test execution from the database filename
-    file_name = file_name.replace("metamorphic_test_run_", "").replace(".db", "")
-    return datetime.strptime(file_name, "%Y-%m-%d_%H-%M-%S")
+def get_sorted_files():
+    # Get the test_run database names, newest first
+    return current_app.extensions['run_catalog'].get_sorted_files()
 
 
 def get_df_from_db(selected_test_runs):
-    folder_path = current_app.config['DIR']
-
     if not selected_test_runs:
-        selected_test_runs = [get_most_recent_run_name(folder_path)]
-
-    global current_test_runs
-    current_test_runs = selected_test_runs
-
-    # create a dataframe from all selected test runs
-    df_list = []
-    for test_run in selected_test_runs:
-        db_path = os.path.join(os.getcwd(), folder_path, test_run)
-        conn = sqlite3.connect(db_path)
-        df_test_run = get_test_results_df(conn)
-        df_list.append(df_test_run)
-        conn.close()
+        selected_test_runs = [get_most_recent_run_name()]
 
-    # update global df variable
-    global global_df
-    global_df = pd.concat(df_list)
-    return global_df
+    # remember the selection of this session, the loaded data is shared by all sessions
+    select_test_runs(selected_test_runs)
+    return get_run_set(selected_test_runs).df
 
 
-def get_test_results_df(conn):
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM mtc_results")
-    rows = cursor.fetchall()
-    df = pd.DataFrame(rows, columns=[desc[0] for desc in cursor.description])
-    df['relation_result'] = df['relation_result'].map({'True': True, 'False': False})
-    return df
+def get_test_run_args():
+    # the test runs given in the request, unknown names are answered with 404
+    test_runs = request.args.getlist('test_run')
+    check_test_runs(test_runs)
+    return test_runs
 
 
-def compile_metadata(df):
-    total = df.shape[0]
-    passed = df[df["test_result"] == "passed"].shape[0]
-    failed = df[df["test_result"] == "failed"].shape[0]
-    skipped = df[df["test_result"] == "skipped"].shape[0]
-    duration = round(df["duration"].sum(), 2)
-    return total, passed, failed, skipped, duration
+def search_runs_artifacts(runs, substring):
+    # search stdout, stderr, inputs and outputs in the FTS sidecar index of every run
+    folder_path = current_app.config['DIR']
+    masks = []
+    for run in runs:
+        ids = search_artifacts(get_run_path(folder_path, run.name),
+                               current_app.config['CACHE_DIR'], substring)
+        masks.append(run.df['_id'].isin(ids).to_numpy())
+    return np.concatenate(masks)
 
 
 def process_df(df):
-    # do not consider skipped test cases in the calculation of the failure rate
-    df = df.loc[df['test_result'] != 'skipped']
-
-    # Group the DataFrame by "mr_name" and "sut_name" and count the occurrences of
-    # "True" in "relation_result"
-    grouped = df.groupby(["mr_name", "sut_name"], group_keys=True)["test_result"].apply(
-        lambda x: (x == "failed").sum())
-
-    # Calculate the total count for each group
-    total_count = df.groupby(["mr_name", "sut_name"], group_keys=True).size()
-
-    # Calculate the failure rate per group
-    failure_rate = grouped / total_count
-
-    # Convert the failure rate Series to a DataFrame with proper column names
-    df_fr = failure_rate.unstack()
+    return format_failure_rate_table(compute_counters(df))
 
-    # add average row
-    df_fr.loc['average'] = df_fr.mean()
 
-    # beauty updates
-    df_fr.columns = [col.replace('test_', '') for col in df_fr.columns]
-    df_fr.columns = [col.replace('_', ' ') for col in df_fr.columns]
-    df_fr.index = [idx.replace('_', ' ') for idx in df_fr.index]
-    df_fr = (df_fr * 100).round(2).astype(str) + '%'
-    df_fr = df_fr.replace('nan%', '-')
+def get_per_page():
+    # number of MTCs per page, from the request or the app config
+    per_page = request.args.get('per_page', current_app.config['PER_PAGE'], type=int)
+    return min(max(per_page, 1), MAX_PER_PAGE)
 
-    styler = df_fr.style
 
-    print(styler.to_latex(hrules=True))
-
-    return df_fr
-
-
-def paginate_df(df):
+def paginate_df(df, positions=None, per_page=None):
     page = request.args.get('page', 1, type=int)
-    per_page = 20
+    per_page = per_page or get_per_page()
+
+    # the rows are shown in the order of positions, by default in the order of the df
+    if positions is None:
+        positions = np.arange(len(df))
 
     # Calculate the start and end indices for the current page
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
 
     # Slice the DataFrame based on the indices
-    sliced_df = df[start_idx:end_idx][["_id", "mtc_name", "mr_name", "sut_name",
-                                       "parameters", "test_result"]]
+    page_positions = positions[max(start_idx, 0):max(end_idx, 0)]
+    sliced_df = df.iloc[page_positions][PAGE_COLUMNS + ['test_run']]
 
     # Calculate the total number of pages for the pagination links
-    total_pages = int(math.ceil(len(df) / per_page))
+    total_pages = int(math.ceil(len(positions) / per_page))
     return page, total_pages, sliced_df
 
 
-def get_sorted_files(folder_path):
-    files = [f for f in os.listdir(folder_path) if
-             os.path.isfile(os.path.join(folder_path, f))]
-
-    return sorted(files, key=extract_datetime_from_filename, reverse=True)
-
-
-@bp.route('/')
-def landing_page():
-    # Get the list of all db files
+def get_page_window(current_page, total_pages, window=PAGE_WINDOW):
+    # first and last page and a window around the current page, None marks skipped pages
+    pages = {1, total_pages} | set(range(current_page - window, current_page + window + 1))
+    pages = sorted(page for page in pages if 1 <= page <= total_pages)
+
+    page_window = []
+    for page in pages:
+        if page_window and page > page_window[-1] + 1:
+            page_window.append(None)
+        page_window.append(page)
+    return page_window
+
+
+def get_pagination_args():
+    # the filter arguments that every pagination link and the page form carry along
+    args = {name: request.args.getlist(name)
+            for name in ['mr_name', 'sut_name', 'test_result', 'substring', 'search_mode',
+                         'per_page']}
+    return {name: values for name, values in args.items() if values}
+
+
+def get_filtered_positions(run_set, filters):
+    # filter results are cached per selection and filters, switching pages only slices them
+    result_cache = current_app.extensions['result_cache']
+    cache_key = (run_set.key, get_filter_key(filters))
+    positions = result_cache.get(cache_key)
+    if positions is not None:
+        return positions
+
+    substring = filters.get('substring')
+    substring_mask = None
+    if substring and filters.get('search_mode') == 'artifacts':
+        substring_mask = search_runs_artifacts(run_set.runs, substring)
+    elif substring:
+        substring_mask = search_runs(run_set.runs, substring)
+
+    positions = get_sorted_positions(run_set, filters, substring_mask)
+    result_cache.put(cache_key, positions, positions.nbytes)
+    return positions
+
+
+def render_failure_rate_table(cache_key, df_fr):
+    # the failure rate table only changes with the test runs, so its HTML is rendered once
+    # per run set and cached with the other rendered exports
+    export_cache = current_app.extensions['export_cache']
+    cache_key = ('failure_rate_html',) + cache_key
+    html = export_cache.get(cache_key)
+    if html is None:
+        # the template escapes the table values, the rendered fragment is safe to include
+        html = Markup(render_template(  # nosec B704
+            'failure_rate_table.html', columns=df_fr.columns.tolist(),
+            rows=list(zip(df_fr.index.tolist(), df_fr.to_numpy().tolist()))))
+        export_cache.put(cache_key, html, len(html))
+    return html
+
+
+def render_report(**context):
+    # the page rows are passed as plain dicts, the time spent in the template is reported
+    # in the Server-Timing header
+    context['individual_test_results'] = context['individual_test_results'].to_dict('records')
+    context['page_window'] = get_page_window(context['current_page'], context['total_pages'])
+    context['pagination_args'] = get_pagination_args()
+    start = time.perf_counter()
+    html = render_template('landing_page.html', **context)
+    g.render_ms = (time.perf_counter() - start) * 1000
+    return html
+
+
+@bp.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@bp.errorhandler(MtcNotFoundError)
+@bp.errorhandler(RunNotFoundError)
+def handle_not_found(error):
+    return Response(str(error), status=404, mimetype='text/plain')
+
+
+@bp.after_request
+def add_server_timing(response):
+    if 'request_start' not in g:
+        return response
+    timings = [f"app;dur={(time.perf_counter() - g.request_start) * 1000:.2f}"]
+    if 'render_ms' in g:
+        timings.append(f"render;dur={g.render_ms:.2f}")
+    elif g.get('page_cache_hit'):
+        timings.append("page-cache;desc=hit")
+    response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+
+@bp.after_request
+def compress_html(response):
+    return compress_response(response, request.accept_encodings)
+
+
+def get_report_validators(test_runs, filters):
+    """
+    ETag and Last-Modified of a report page. The page only changes with the selected test
+    run files, the filters and arguments, the list of test runs and the app config, so the
+    ETag is computed from these without loading or rendering anything. Returns None if a
+    selected test run does not exist.
+    """
     folder_path = current_app.config['DIR']
-
-    # check if test_results is empty: No tests have been executed with --html-report
-    if not os.path.exists(folder_path) or not os.listdir(folder_path):
-        # if no results have been found, display the following hint message
-        hint_message = ('Please run a test using <span style="color: blue; font-weight: bold'
-                        ';">poetry run pytest --html-report &lt;test-file path&gt;</span>.')
-        return render_template("empty_landing_page.html", hint_message=hint_message)
-
-    files = get_sorted_files(folder_path)
-
-    if global_df is None:
-        df = get_df_from_db(selected_test_runs=current_test_runs)
+    try:
+        run_keys = [get_run_key(get_run_path(folder_path, test_run)) for test_run in test_runs]
+    except OSError:
+        return None
+
+    config = tuple(current_app.config[name] for name in
+                   ('QUERY_MODE', 'LIVE_MODE', 'PER_PAGE', 'SEARCH_COLUMNS'))
+    etag = get_etag(request.path, sorted(request.args.items(multi=True)),
+                    sorted(filters.items()), run_keys, get_sorted_files(), config)
+    last_modified = max(mtime_ns for _, _, mtime_ns in run_keys) / 1e9
+    return etag, last_modified
+
+
+def send_report(test_runs, filters, render):
+    """
+    Answer a report page with validators for conditional requests. A matching
+    If-None-Match is answered with 304 before anything is loaded, other requests are
+    served from the page cache, which keeps the compressed page per ETag and encoding.
+    The page depends on the session, so caches have to revalidate it every time.
+    """
+    validators = get_report_validators(test_runs, filters)
+    if validators is None:
+        return render(test_runs, filters)
+    etag, last_modified = validators
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
     else:
-        df = global_df
-
-    df_fr = process_df(df)
-    total, passed, failed, skipped, duration = compile_metadata(df)
+        encoding = choose_encoding(request.accept_encodings)
+        page_cache = current_app.extensions['page_cache']
+        body = page_cache.get((etag, encoding))
+        g.page_cache_hit = body is not None
+        if body is None:
+            body = compress(render(test_runs, filters).encode(), encoding)
+            page_cache.put((etag, encoding), body, len(body))
+        response = Response(body, mimetype='text/html')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+
+    # compressed and uncompressed pages are equivalent, hence the weak ETag
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(['Cookie', 'Accept-Encoding'])
+    return response
+
+
+def render_memory_report(test_runs, filters):
+    # memory mode: the selected test runs are loaded into one DataFrame
+    files = get_sorted_files()
+
+    run_set = get_run_set(test_runs)
+    total, passed, failed, skipped, duration = run_set.metadata
 
     landing_page_data = {
         'num_executed': total,
@@ -157,100 +270,65 @@ def landing_page():
         'num_failed': failed,
         'num_skipped': skipped,
         'execution_time': duration,
-        'table_data': df_fr
+        'table_data': render_failure_rate_table(run_set.key, run_set.df_fr)
     }
 
-    if global_df_filtered is not None:
-        df_filtered = global_df_filtered
-    else:
-        df_filtered = df
-
-    # Sort the DataFrame by the "relation_result" column
-    df_filtered = df_filtered.sort_values(by='relation_result', ascending=True)
+    # paginate the filtered rows, sorted by the "relation_result" column
+    positions = get_filtered_positions(run_set, filters)
+    page, total_pages, df_sliced = paginate_df(run_set.df, positions)
 
-    # paginate the df
-    page, total_pages, df_sliced = paginate_df(df_filtered)
-
-    return render_template(
-        template_name_or_list='landing_page.html',
+    return render_report(
         files=files,
-        current_test_run=current_test_runs,
-        data=landing_page_data,
         individual_test_results=df_sliced,
+        current_test_run=test_runs,
+        data=landing_page_data,
         total_pages=total_pages,
         current_page=page,
-        unique_mr_names=df["mr_name"].unique(),
-        unique_sut_names=df["sut_name"].unique(),
-        unique_test_results=df["test_result"].unique()
+        unique_mr_names=run_set.unique_values['mr_name'],
+        unique_sut_names=run_set.unique_values['sut_name'],
+        unique_test_results=run_set.unique_values['test_result']
     )
 
 
-@bp.route('/select', methods=['GET'])
-def select_test_run():
-    # Reset filtered df when a new test run is selected, there should be no filters applied.
-    global global_df_filtered
-    global_df_filtered = None
-
-    # Get the list of all db files
-    folder_path = current_app.config['DIR']
-
-    files = get_sorted_files(folder_path)
-
-    # connect to selected test run databases and fetch stored results
-    selected_test_runs = request.args.getlist('test_run')
-    df = get_df_from_db(selected_test_runs=selected_test_runs)
-
-    df_fr = process_df(df)
-    total, passed, failed, skipped, duration = compile_metadata(df)
-
-    landing_page_data = {
-        'num_executed': total,
-        'num_passed': passed,
-        'num_failed': failed,
-        'num_skipped': skipped,
-        'execution_time': duration,
-        'table_data': df_fr
+def get_filter_args():
+    return {
+        'mr_name': request.args.getlist('mr_name'),
+        'sut_name': request.args.getlist('sut_name'),
+        'test_result': request.args.getlist('test_result'),
+        'substring': request.args.get('substring'),
+        'search_mode': request.args.get('search_mode', 'report'),
     }
 
-    # Sort the DataFrame by the "relation_result" column
-    df = df.sort_values(by='relation_result', ascending=True)
 
-    # paginate the df
-    page, total_pages, df_sliced = paginate_df(df)
+def get_match_ids(runs, filters):
+    # query mode: the ids of the MTCs whose artifacts contain the substring, per test run
+    if not (filters.get('substring') and filters.get('search_mode') == 'artifacts'):
+        return None
+    return {test_run: search_artifacts(get_run_path(current_app.config['DIR'], test_run),
+                                       current_app.config['CACHE_DIR'], filters['substring'])
+            for test_run, _ in runs}
 
-    return render_template(
-        'landing_page.html',
-        individual_test_results=df_sliced,
-        current_test_run=current_test_runs,
-        files=files,
-        data=landing_page_data,
-        total_pages=total_pages,
-        current_page=page,
-        unique_mr_names=df['mr_name'].unique(),
-        unique_sut_names=df["sut_name"].unique(),
-        unique_test_results=df["test_result"].unique()
-    )
-
-
-@bp.route('/filter', methods=['GET'])
-def filter_test_cases():  # pylint: disable=too-many-locals
-    # Get the list of all db files
-    folder_path = current_app.config['DIR']
 
-    files = get_sorted_files(folder_path)
+def get_column_args():
+    # the requested summary columns, _id and test_run identify an MTC and always come first
+    value = request.args.get('columns')
+    columns = [col.strip() for col in value.split(',') if col.strip()] if value else []
+    unknown = [col for col in columns if col not in SUMMARY_COLUMNS + ['test_run']]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}, choose from {SUMMARY_COLUMNS}")
+    columns = columns or SUMMARY_COLUMNS
+    return ['_id', 'test_run'] + [col for col in columns if col not in ('_id', 'test_run')]
 
-    if global_df is None:
-        raise TypeError("No test run selected as global_df is None")
 
-    df = global_df
+def render_query_report(test_runs, filters):  # pylint: disable=too-many-locals
+    # query mode: answer the report page with SQL, only one page of MTCs is read
+    files = get_sorted_files()
 
-    # Retain original unfiltered options for dropdowns
-    all_mr_names = df['mr_name'].unique()
-    all_sut_names = df['sut_name'].unique()
-    all_test_results = df['test_result'].unique()
+    runs = get_query_runs(test_runs)
+    groups = pd.concat([query_groups(query_path) for _, query_path in runs])
 
-    df_fr = process_df(df)
-    total, passed, failed, skipped, duration = compile_metadata(df)
+    df_fr = format_failure_rate_table(counters_from_groups(groups))
+    total, passed, failed, skipped, duration = metadata_from_groups(groups)
 
     landing_page_data = {
         'num_executed': total,
@@ -258,60 +336,168 @@ def filter_test_cases():  # pylint: disable=too-many-locals
         'num_failed': failed,
         'num_skipped': skipped,
         'execution_time': duration,
-        'table_data': df_fr
+        'table_data': render_failure_rate_table(
+            tuple(str(query_path) for _, query_path in runs), df_fr)
     }
 
-    selected_mr = request.args.getlist('mr_name')
-    selected_sut = request.args.getlist('sut_name')
-    selected_test_result = request.args.getlist('test_result')
-    substring = request.args.get('substring')
+    page = request.args.get('page', 1, type=int)
+    per_page = get_per_page()
+    df_sliced, count = query_page(runs, filters, current_app.config['SEARCH_COLUMNS'],
+                                  page, per_page, get_match_ids(runs, filters))
+    total_pages = int(math.ceil(count / per_page))
 
-    # Filter by Metamorphic Relation
-    if selected_mr and selected_mr != ["all"]:
-        df = df[df['mr_name'].isin(selected_mr)]
+    return render_report(
+        files=files,
+        individual_test_results=df_sliced,
+        current_test_run=test_runs,
+        data=landing_page_data,
+        total_pages=total_pages,
+        current_page=page,
+        unique_mr_names=groups['mr_name'].unique(),
+        unique_sut_names=groups['sut_name'].unique(),
+        unique_test_results=groups['test_result'].unique()
+    )
 
-    # Filter by System Under Test
-    if selected_sut and selected_sut != ["all"]:
-        df = df[df['sut_name'].isin(selected_sut)]
 
-    # Filter by Test Result
-    if selected_test_result and selected_test_result != ["all"]:
-        df = df[df['test_result'].isin(selected_test_result)]
+def get_report_renderer():
+    if current_app.config['QUERY_MODE'] == 'sql':
+        return render_query_report
+    return render_memory_report
 
-    # Apply substring filter
-    if substring:
-        df = df[df.applymap(lambda cell: substring.lower() in str(cell).lower()).any(axis=1)]
 
-    # Sort the DataFrame by the "relation_result" column
-    df = df.sort_values(by='relation_result', ascending=True)
+@bp.route('/')
+def landing_page():
+    # check if test_results is empty: No tests have been executed with --html-report
+    if not get_sorted_files():
+        # if no results have been found, display the following hint message
+        hint_message = ('Please run a test using <span style="color: blue; font-weight: bold'
+                        ';">poetry run pytest --html-report &lt;test-file path&gt;</span>.')
+        return render_template("empty_landing_page.html", hint_message=hint_message)
 
-    # update the global df variable
-    global global_df_filtered
-    global_df_filtered = df
+    return send_report(get_current_test_runs(), get_filters(), get_report_renderer())
 
-    # Paginate the df
-    page, total_pages, df_sliced = paginate_df(df)
 
-    return render_template(
-        'landing_page.html',
-        files=files,
-        individual_test_results=df_sliced,
-        current_test_run=current_test_runs,
-        data=landing_page_data,
-        total_pages=total_pages,
-        current_page=page,
-        unique_mr_names=all_mr_names,
-        unique_sut_names=all_sut_names,
-        unique_test_results=all_test_results
-    )
+@bp.route('/select', methods=['GET'])
+def select_test_run():
+    # A new selection resets the filters, there should be no filters applied.
+    test_runs = request.args.getlist('test_run') or [get_most_recent_run_name()]
+    select_test_runs(test_runs)
+    return send_report(test_runs, get_filters(), get_report_renderer())
 
 
-def _get_values_valid_path(row, value_type):
+@bp.route('/filter', methods=['GET'])
+def filter_test_cases():
+    test_runs = get_current_test_runs()
+    filters = get_filter_args()
+    set_filters(filters)
+    return send_report(test_runs, filters, get_report_renderer())
+
+
+@bp.route('/export/latex', methods=['GET'])
+def export_latex():
+    # export the failure rate table of the given or currently selected test runs
+    selected_test_runs = get_test_run_args() or get_current_test_runs()
+
+    latex = get_failure_rate_latex(load_runs(selected_test_runs),
+                                   current_app.extensions['export_cache'])
+    return Response(latex, mimetype='application/x-tex', headers={
+        'Content-Disposition': 'attachment; filename=failure_rates.tex'})
+
+
+def get_progress_snapshot(test_runs):
+    # key, metadata and failure counters of the test runs, in both query modes
+    if current_app.config['QUERY_MODE'] == 'sql':
+        runs = get_query_runs(test_runs)
+        groups = pd.concat([query_groups(query_path) for _, query_path in runs])
+        return (tuple(query_path for _, query_path in runs), metadata_from_groups(groups),
+                counters_from_groups(groups))
+
+    run_set = get_run_set(test_runs)
+    return (run_set.key, run_set.metadata,
+            merge_counters([run.counters for run in run_set.runs]))
+
+
+@bp.route('/progress', methods=['GET'])
+def progress():
+    # stream the counters of the given or currently selected test runs while they are
+    # being executed, see stream_progress
+    test_runs = get_test_run_args() or get_current_test_runs()
+
+    # every stream holds a server thread, beyond the limit clients have to retry later
+    stream_limiter = current_app.extensions['progress_streams']
+    if not stream_limiter.acquire():
+        return Response("Too many open progress streams", status=503, mimetype='text/plain',
+                        headers={'Retry-After': str(RETRY_AFTER)})
+
+    events = stream_progress(lambda: get_progress_snapshot(test_runs),
+                             current_app.config['PROGRESS_INTERVAL'],
+                             current_app.config['PROGRESS_TIMEOUT'])
+    response = Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # called by the server when the stream ends or the client disconnects
+    response.call_on_close(stream_limiter.release)
+    return response
+
+
+def iter_export_chunks(test_runs, filters, columns):
+    # the filtered MTCs in the order of the report, a chunk of rows at a time
+    if current_app.config['QUERY_MODE'] == 'sql':
+        runs = get_query_runs(test_runs)
+        chunks = iter_query_chunks(runs, filters, current_app.config['SEARCH_COLUMNS'],
+                                   [col for col in columns if col != 'test_run'],
+                                   EXPORT_CHUNK_SIZE, get_match_ids(runs, filters))
+        return (chunk[columns] for chunk in chunks)
+
+    run_set = get_run_set(test_runs)
+    return iter_run_set_chunks(run_set, get_filtered_positions(run_set, filters), columns)
+
+
+@bp.route('/export/mtcs', methods=['GET'])
+def export_mtcs():
+    """
+    Export all MTCs of the given or selected test runs that match the filter arguments of
+    /filter as CSV, NDJSON or Parquet. CSV and NDJSON are streamed chunk by chunk, Parquet
+    is written chunk by chunk to a temporary file, so memory use does not grow with the
+    number of MTCs.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        abort(400, f"Unknown export format {export_format}, "
+                   f"choose from {list(EXPORT_FORMATS)}")
+    try:
+        columns = get_column_args()
+    except ValueError as error:
+        abort(400, str(error))
+
+    selected_test_runs = get_test_run_args() or get_current_test_runs()
+    chunks = iter_export_chunks(selected_test_runs, get_filter_args(), columns)
+    file_name = f"mtcs.{export_format}"
+
+    if export_format == 'parquet':
+        file = tempfile.TemporaryFile()
+        try:
+            write_parquet(chunks, columns, file)
+        except RuntimeError as error:
+            file.close()
+            abort(501, str(error))
+        file.seek(0)
+        return send_file(file, mimetype=EXPORT_FORMATS[export_format], as_attachment=True,
+                         download_name=file_name)
+
+    body = iter_csv(chunks, columns) if export_format == 'csv' else iter_ndjson(chunks)
+    return Response(body, mimetype=EXPORT_FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename={file_name}'})
+
+
+def _get_values_valid_path(artifacts, value_type):
     separator = "__\n\r__"
-    values = row[value_type].split(separator)
+    values = artifacts[value_type].split(separator)
     paths_to_posix(values)
-    is_valid_path = [os.path.exists(os.path.join("app/static/" + value)) for value in values]
-    return {'values': values, 'is_valid_path': is_valid_path}
+    # the artifact manifest answers from memory, no file system access per value
+    manifest = current_app.extensions['artifact_manifest']
+    versions = [manifest.get_version(value) for value in values]
+    is_valid_path = [version is not None for version in versions]
+    return {'values': values, 'is_valid_path': is_valid_path, 'versions': versions}
 
 
 def paths_to_posix(values):
@@ -321,15 +507,20 @@ def paths_to_posix(values):
 
 @bp.route('/mtc_detail_view/<test_case_id>')
 def mtc_detail_view(test_case_id):
-    # Load the row from the DataFrame based on the test_case_id
+    # Load the row based on the test run and the test_case_id, which is unique per run.
+    # Without a test run, the first selected test run containing the MTC is used.
     test_case_id = int(test_case_id)
-    row = global_df[global_df['_id'] == test_case_id].iloc[0]
+    test_run, row = find_test_case(request.args.get('test_run'), test_case_id)
+
+    # artifacts are not part of the loaded summary, fetch them for this MTC only
+    db_path = get_run_path(current_app.config['DIR'], test_run)
+    artifacts = get_mtc_artifacts(db_path, test_case_id)
 
     # string representation of inputs and outputs
-    source_inputs = _get_values_valid_path(row, 'source_inputs')
-    followup_inputs = _get_values_valid_path(row, 'followup_inputs')
-    source_outputs = _get_values_valid_path(row, 'source_outputs')
-    followup_outputs = _get_values_valid_path(row, 'followup_outputs')
+    source_inputs = _get_values_valid_path(artifacts, 'source_inputs')
+    followup_inputs = _get_values_valid_path(artifacts, 'followup_inputs')
+    source_outputs = _get_values_valid_path(artifacts, 'source_outputs')
+    followup_outputs = _get_values_valid_path(artifacts, 'followup_outputs')
 
     sut = f"⇨ {row['sut_name']} ⇨"
     transformation = f"⇩ {row['transformation_name']} ⇩"
@@ -341,6 +532,7 @@ def mtc_detail_view(test_case_id):
     return render_template(
         'mtc_detail_view.html',
         test_case_id=test_case_id,
+        test_run=test_run,
         source_inputs=source_inputs,
         followup_inputs=followup_inputs,
         source_outputs=source_outputs,
@@ -348,8 +540,8 @@ def mtc_detail_view(test_case_id):
         sut=sut,
         transformation=transformation,
         relation=relation,
-        stdout=row['stdout'],
-        stderr=row['stderr'],
+        stdout=artifacts['stdout'],
+        stderr=artifacts['stderr'],
         sut_name=row['sut_name'],
         mr_name=row['mr_name'],
         mtc_name=row['mtc_name'],
@@ -1,24 +1,177 @@
 import importlib.metadata
 from pathlib import Path
+from typing import Optional, TextIO, Tuple
 
 import click
+from flask import Flask
 
-from app import create_app
+from app import (DEFAULT_CACHE_MB, DEFAULT_MAX_STREAMS, DEFAULT_PAGE_CACHE_MB,
+                 DEFAULT_PER_PAGE, create_app)
+from app.export import get_failure_rate_latex
+from app.fts import build_fts_index
+from app.loader import SUMMARY_COLUMNS, get_run_path
+from app.routes import MAX_PER_PAGE
+from app.serve import serve as serve_app
+from app.state import load_runs
 
 default_dir = Path("gemtest_results")
 
 
-@click.command(help="Run the gemtest-webapp app")
+def parse_search_columns(_ctx: click.Context, _param: click.Parameter,
+                         value: str) -> Tuple[str, ...]:
+    columns = tuple(col.strip() for col in value.split(",") if col.strip())
+    unknown = [col for col in columns if col not in SUMMARY_COLUMNS]
+    if unknown:
+        raise click.BadParameter(f"unknown columns {', '.join(unknown)}, "
+                                 f"choose from {', '.join(SUMMARY_COLUMNS)}")
+    return columns
+
+
+@click.group(help="Run the gemtest-webapp app", invoke_without_command=True)
 @click.option("--results-dir",
               type=click.Path(exists=True, dir_okay=True, path_type=Path),
               default=default_dir,
               help="The directory where gemtest-webapp loads results from.")
+@click.option("--cache-dir",
+              type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+              default=None,
+              help="The directory where loaded test runs are cached "
+                   "(default: <results-dir>_cache).")
+@click.option("--cache-mb",
+              type=click.IntRange(min=0),
+              default=DEFAULT_CACHE_MB,
+              show_default=True,
+              help="Memory budget in MB for keeping loaded test runs in memory.")
+@click.option("--load-workers",
+              type=click.IntRange(min=1),
+              default=None,
+              help="Number of test runs that are loaded in parallel "
+                   "(default: depends on the number of CPUs).")
+@click.option("--search-columns",
+              default=",".join(SUMMARY_COLUMNS),
+              callback=parse_search_columns,
+              help="Comma separated list of the columns searched by the substring filter "
+                   "(default: all report columns).")
+@click.option("--query-mode",
+              type=click.Choice(["memory", "sql"]),
+              default="memory",
+              show_default=True,
+              help="'memory' loads the selected test runs into memory, 'sql' filters, sorts "
+                   "and paginates with SQL so that runs larger than RAM can be served.")
+@click.option("--scan-interval", type=click.FloatRange(min=0), default=1.0, show_default=True,
+              help="Minimum number of seconds between checks of the results dir for new "
+                   "test runs.")
+@click.option("--live", is_flag=True,
+              help="Update test runs that are still being executed by reading only their "
+                   "new MTCs.")
+@click.option("--per-page", type=click.IntRange(min=1, max=MAX_PER_PAGE),
+              default=DEFAULT_PER_PAGE, show_default=True,
+              help="Number of MTCs per report page, pages can request another size with "
+                   "'per_page'.")
+@click.option("--artifact-root",
+              type=click.Path(file_okay=False, path_type=Path),
+              default=None,
+              help="Directory the visualizer files referenced by the MTCs are relative to "
+                   "(default: app/static in the current working directory).")
+@click.option("--page-cache-mb", type=click.IntRange(min=0), default=DEFAULT_PAGE_CACHE_MB,
+              show_default=True,
+              help="Memory budget in MB for rendered report pages, 0 disables the cache.")
+@click.option("--max-streams", type=click.IntRange(min=0), default=DEFAULT_MAX_STREAMS,
+              show_default=True,
+              help="Number of live progress streams served at once per worker, every open "
+                   "stream holds one of the --threads.")
+@click.option("--serve", is_flag=True,
+              help="Serve the app with a production WSGI server instead of the Flask "
+                   "development server (requires the 'serve' extra).")
+@click.option("--host", default="127.0.0.1", show_default=True,
+              help="The interface the server listens on.")
+@click.option("--port", type=int, default=5000, show_default=True,
+              help="The port the server listens on.")
+@click.option("--threads", type=click.IntRange(min=1), default=4, show_default=True,
+              help="Number of threads per worker process, used with --serve.")
+@click.option("--workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of worker processes, used with --serve. More than one worker "
+                   "requires gunicorn.")
 @click.version_option(version=importlib.metadata.version("gemtest-webapp"))
-def main(results_dir: Path = default_dir) -> None:
-    app = create_app(results_dir)
+@click.pass_context
+def main(ctx: click.Context,  # pylint: disable=too-many-arguments,too-many-locals
+         results_dir: Path = default_dir, cache_dir: Optional[Path] = None,
+         cache_mb: int = DEFAULT_CACHE_MB, load_workers: Optional[int] = None,
+         search_columns: Tuple[str, ...] = tuple(SUMMARY_COLUMNS),
+         query_mode: str = "memory", scan_interval: float = 1.0, live: bool = False,
+         per_page: int = DEFAULT_PER_PAGE, artifact_root: Optional[Path] = None,
+         page_cache_mb: int = DEFAULT_PAGE_CACHE_MB, max_streams: int = DEFAULT_MAX_STREAMS,
+         serve: bool = False, host: str = "127.0.0.1", port: int = 5000, threads: int = 4,
+         workers: int = 1) -> None:
+    app = create_app(results_dir, cache_dir, cache_mb, load_workers, search_columns,
+                     query_mode, scan_interval, live, per_page, artifact_root, page_cache_mb,
+                     max_streams)
+
+    # subcommands work on the configured app instead of starting the server
+    if ctx.invoked_subcommand is not None:
+        ctx.obj = app
+        return
+
+    if serve:
+        try:
+            serve_app(app, host, port, workers, threads)
+        except RuntimeError as error:
+            raise click.UsageError(str(error)) from error
+    else:
+        app.run(host=host, port=port)
+
+
+@main.command("export-latex", help="Export the failure rate table of test runs as LaTeX")
+@click.option("--test-run", "test_runs",
+              multiple=True,
+              help="Name of a test run database, can be given multiple times "
+                   "(default: the most recent test run).")
+@click.option("--output",
+              type=click.File("w", encoding="utf-8"),
+              default="-",
+              help="The file the LaTeX table is written to (default: stdout).")
+@click.pass_obj
+def export_latex(app: Flask, test_runs: Tuple[str, ...], output: TextIO) -> None:
+    with app.app_context():
+        selected_test_runs = (list(test_runs)
+                              or [app.extensions['run_catalog'].get_most_recent_run_name()])
+        output.write(get_failure_rate_latex(load_runs(selected_test_runs)))
+
+
+@main.command("build-index",
+              help="Build the full-text index used to search stdout, stderr and artifacts")
+@click.option("--test-run", "test_runs",
+              multiple=True,
+              help="Name of a test run database, can be given multiple times "
+                   "(default: all test runs).")
+@click.pass_obj
+def build_index(app: Flask, test_runs: Tuple[str, ...]) -> None:
+    results_dir = app.config['DIR']
+    for test_run in test_runs or app.extensions['run_catalog'].get_sorted_files():
+        fts_path = build_fts_index(get_run_path(results_dir, test_run),
+                                   app.config['CACHE_DIR'])
+        click.echo(f"Indexed {test_run} into {fts_path}")
+
 
-    app.run()
+@main.command("memory-usage", help="Report the memory used by loaded test runs")
+@click.option("--test-run", "test_runs",
+              multiple=True,
+              help="Name of a test run database, can be given multiple times "
+                   "(default: the most recent test run).")
+@click.option("--columns", is_flag=True, help="Also report the memory used per column.")
+@click.pass_obj
+def memory_usage(app: Flask, test_runs: Tuple[str, ...], columns: bool) -> None:
+    with app.app_context():
+        selected_test_runs = (list(test_runs)
+                              or [app.extensions['run_catalog'].get_most_recent_run_name()])
+        for run in load_runs(selected_test_runs):
+            usage = run.memory_usage()
+            click.echo(f"{run.name}: {len(run.df)} MTCs, {usage.sum() / 2 ** 20:.1f} MB "
+                       f"({usage.sum() / max(len(run.df), 1):.0f} bytes per MTC)")
+            if columns:
+                for column, nbytes in usage.items():
+                    click.echo(f"  {column}: {nbytes / 2 ** 20:.2f} MB")
 
 
 if __name__ == '__main__':
-    main()
+    main()  # pylint: disable=no-value-for-parameter
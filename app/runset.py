@@ -0,0 +1,148 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from app.cache import estimate_df_bytes
+from app.export import get_failure_rate_table
+from app.loader import MtcNotFoundError, concat_summary_dfs
+from app.query import FILTER_COLUMNS
+
+
+@dataclass
+class RunSet:
+    """
+    The selected test runs concatenated into one DataFrame, with everything the report
+    needs that does not depend on the filters, computed once per selection.
+    """
+    runs: list
+    df: pd.DataFrame
+    df_fr: pd.DataFrame
+    metadata: tuple
+    unique_values: dict
+    relation_order: np.ndarray = field(repr=False)
+    run_offsets: dict = field(repr=False)
+
+    @property
+    def key(self):
+        return tuple(run.key for run in self.runs)
+
+    @property
+    def nbytes(self):
+        # a single test run is used as is, only a concatenation needs memory of its own,
+        # the test runs themselves are counted by their own run cache entries
+        df_bytes = estimate_df_bytes(self.df) if len(self.runs) > 1 else 0
+        return df_bytes + self.relation_order.nbytes
+
+    def locate(self, test_run, test_case_id):
+        # position of an MTC in df, _id values are only unique within one test run
+        if test_run is None:
+            test_run = next((run.name for run in self.runs if test_case_id in run.id_index),
+                            None)
+        if test_run not in self.run_offsets:
+            raise MtcNotFoundError(f"MTC {test_case_id} not found in the selected test runs")
+
+        offset, run = self.run_offsets[test_run]
+        if test_case_id not in run.id_index:
+            raise MtcNotFoundError(f"MTC {test_case_id} not found in {test_run}")
+        return offset + run.id_index.get_loc(test_case_id)
+
+
+def compile_metadata(runs):
+    # the result counts are computed when a test run is loaded, here they are only added up
+    counts = sum(run.result_counts for run in runs)
+    total = int(counts["total"])
+    passed = int(counts["passed"])
+    failed = int(counts["failed"])
+    skipped = int(counts["skipped"])
+    duration = round(counts["duration"], 2)
+    return total, passed, failed, skipped, duration
+
+
+def get_relation_order(df):
+    # sort key of relation_result: False < True < missing, like sort_values
+    relation_result = df['relation_result']
+    order = np.full(len(df), 2, dtype=np.int8)
+    order[relation_result.eq(True).to_numpy(dtype=bool, na_value=False)] = 1
+    order[relation_result.eq(False).to_numpy(dtype=bool, na_value=False)] = 0
+    return order
+
+
+def get_run_offsets(runs):
+    # position of the first row of every test run in the concatenated DataFrame
+    offsets = np.cumsum([0] + [len(run.df) for run in runs[:-1]])
+    return {run.name: (int(offset), run) for offset, run in zip(offsets, runs)}
+
+
+def build_run_set(runs):
+    if len(runs) == 1:
+        df = runs[0].df
+    else:
+        df = concat_summary_dfs(run.df for run in runs)
+    return RunSet(
+        runs=runs,
+        df=df,
+        df_fr=get_failure_rate_table(runs),
+        metadata=compile_metadata(runs),
+        unique_values={col: df[col].unique() for col in FILTER_COLUMNS},
+        relation_order=get_relation_order(df),
+        run_offsets=get_run_offsets(runs),
+    )
+
+
+def get_filter_key(filters):
+    # hashable representation of the filter arguments
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in filters.items()))
+
+
+def get_sorted_positions(run_set, filters, substring_mask=None):
+    """
+    Positions of the rows of the run set that match the filters, sorted by relation_result.
+    The sort is stable, so rows with the same relation_result keep their run and row order.
+    """
+    df = run_set.df
+    mask = np.ones(len(df), dtype=bool) if substring_mask is None else substring_mask.copy()
+
+    for col in FILTER_COLUMNS:
+        values = filters.get(col)
+        if values and values != ["all"]:
+            mask &= df[col].isin(values).to_numpy()
+
+    positions = np.flatnonzero(mask)
+    return positions[np.argsort(run_set.relation_order[positions], kind='stable')]
+
+
+def _group_start(run_set, positions, relation_order):
+    # first index of positions whose row has at least the given relation_order
+    low, high = 0, len(positions)
+    while low < high:
+        middle = (low + high) // 2
+        if run_set.relation_order[positions[middle]] < relation_order:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def get_cursor_start(run_set, positions, cursor):
+    """
+    Index of the first entry of the sorted positions that follows the cursor, a
+    (relation_order, run index, _id) tuple. Within one relation_order the positions are
+    ascending, i.e. ordered by run and _id, so two binary searches suffice.
+    """
+    relation_order, run_index, test_case_id = cursor
+    offset, run = run_set.run_offsets[run_set.runs[run_index].name]
+    position = offset + int(run.id_index.searchsorted(test_case_id, side='right'))
+
+    start = _group_start(run_set, positions, relation_order)
+    end = _group_start(run_set, positions, relation_order + 1)
+    return start + int(np.searchsorted(positions[start:end], position))
+
+
+def get_cursor(run_set, position):
+    # (relation_order, run index, _id) of the row at the given position of the run set
+    offsets = [offset for offset, _ in run_set.run_offsets.values()]
+    run_index = int(np.searchsorted(offsets, position, side='right')) - 1
+    return (int(run_set.relation_order[position]), run_index,
+            int(run_set.df['_id'].iat[position]))
@@ -0,0 +1,101 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Separates the distinct values of a column in the packed search text
+VALUE_SEPARATOR = "\x00"
+
+
+class ColumnIndex:
+    """
+    Dictionary encoded, lower-cased text of one column. Every row stores the code of its
+    distinct value, the distinct values are packed into one string that is searched at
+    C speed, so a query never calls Python code per row.
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values)
+        uniques = [str(value).lower() for value in uniques]
+
+        # missing values get their own code, like str(cell) they are searchable as 'nan'
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(uniques), codes)
+            uniques.append("nan")
+
+        self.codes = codes
+        self.text = VALUE_SEPARATOR.join(uniques)
+        self.starts = np.cumsum([0] + [len(value) + 1 for value in uniques[:-1]])
+        self.num_values = len(uniques)
+
+    def match(self, substring):
+        # find the distinct values that contain the substring and mark all of their rows
+        value_hits = np.zeros(self.num_values, dtype=bool)
+        offsets = [m.start() for m in re.finditer(re.escape(substring), self.text)]
+        if offsets:
+            value_hits[np.searchsorted(self.starts, offsets, side='right') - 1] = True
+        return value_hits[self.codes]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.starts.nbytes + len(self.text)
+
+
+class SearchIndex:
+    """
+    Substring index over the searchable columns of a loaded test run.
+    """
+
+    def __init__(self, df, columns):
+        self.length = len(df)
+        self.columns = {col: ColumnIndex(df[col]) for col in columns if col in df.columns}
+
+    def match(self, substring):
+        # boolean mask of the rows where any searchable column contains the substring
+        substring = substring.lower()
+        mask = np.zeros(self.length, dtype=bool)
+        if VALUE_SEPARATOR in substring:
+            return mask
+        for column_index in self.columns.values():
+            mask |= column_index.match(substring)
+        return mask
+
+    @property
+    def nbytes(self):
+        return sum(column_index.nbytes for column_index in self.columns.values())
+
+
+class ChunkedSearchIndex:
+    """
+    Substring index of a live test run that grows while it is executed. Appended rows are
+    indexed as a chunk of their own and chunks of similar size are merged, so a run with
+    n rows is covered by O(log n) chunks.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    @property
+    def length(self):
+        return sum(chunk.length for chunk in self.chunks)
+
+    def append(self, df, columns):
+        # index over all rows of df, whose leading rows are covered by this index
+        chunks = list(self.chunks)
+        start = self.length
+        while chunks and chunks[-1].length <= len(df) - start:
+            start -= chunks.pop().length
+        chunks.append(SearchIndex(df.iloc[start:], columns))
+        return ChunkedSearchIndex(chunks)
+
+    def match(self, substring):
+        return np.concatenate([chunk.match(substring) for chunk in self.chunks])
+
+    @property
+    def nbytes(self):
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+
+def search_runs(runs, substring):
+    # the masks of all runs line up with the concatenated DataFrame of the run set
+    return np.concatenate([run.search_index.match(substring) for run in runs])
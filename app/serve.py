@@ -0,0 +1,63 @@
+import importlib.util
+
+from flask import Flask
+
+from app.loader import get_run_path
+from app.query import build_query_db
+from app.state import get_run_set
+
+
+def preload(app: Flask) -> None:
+    """
+    Load the most recent test run before the server starts. Workers forked afterwards
+    share the loaded data with the main process instead of loading it again.
+    """
+    test_run = app.extensions['run_catalog'].get_most_recent_run_name()
+    if test_run is None:
+        return
+
+    results_dir = app.config['DIR']
+    with app.app_context():
+        if app.config['QUERY_MODE'] == 'sql':
+            build_query_db(get_run_path(results_dir, test_run), app.config['CACHE_DIR'])
+        else:
+            get_run_set([test_run])
+
+
+def serve_waitress(app: Flask, host: str, port: int, threads: int) -> None:
+    import waitress  # pylint: disable=import-outside-toplevel
+
+    waitress.serve(app, host=host, port=port, threads=threads)
+
+
+def serve_gunicorn(app: Flask, host: str, port: int, workers: int, threads: int) -> None:
+    # pylint: disable=import-outside-toplevel
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornApplication(BaseApplication):  # pylint: disable=abstract-method
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            return app
+
+    GunicornApplication().run()
+
+
+def serve(app: Flask, host: str, port: int, workers: int, threads: int) -> None:
+    # several worker processes need gunicorn, a single process is served by waitress
+    if workers > 1:
+        if importlib.util.find_spec("gunicorn") is None:
+            raise RuntimeError("Serving with several workers requires gunicorn, "
+                               "install it with 'pip install gemtest-webapp[serve]'")
+        preload(app)
+        serve_gunicorn(app, host, port, workers, threads)
+    else:
+        if importlib.util.find_spec("waitress") is None:
+            raise RuntimeError("Serving requires waitress, "
+                               "install it with 'pip install gemtest-webapp[serve]'")
+        preload(app)
+        serve_waitress(app, host, port, threads)
@@ -0,0 +1,153 @@
+from flask import current_app, session
+
+from app.cache import get_run_key
+from app.catalog import RunNotFoundError
+from app.export import df_to_rows
+from app.loader import (SUMMARY_COLUMNS, MtcNotFoundError, get_run_path, load_test_runs,
+                        tail_test_run)
+from app.query import build_query_db, query_row
+from app.runset import build_run_set
+
+# The selection and filters of a user are stored in the session, the loaded test runs and
+# run sets are immutable and shared by all sessions through the run cache.
+
+
+def check_test_runs(test_runs):
+    # test run names from requests have to be listed in the results dir
+    run_catalog = current_app.extensions['run_catalog']
+    unknown_runs = [test_run for test_run in test_runs if not run_catalog.has_run(test_run)]
+    if unknown_runs:
+        raise RunNotFoundError(f"Unknown test runs: {unknown_runs}")
+
+
+def get_selected_test_runs():
+    # test runs deleted from the results dir since they were selected are dropped
+    run_catalog = current_app.extensions['run_catalog']
+    return [test_run for test_run in session.get('test_runs', [])
+            if run_catalog.has_run(test_run)]
+
+
+def select_test_runs(test_runs):
+    # a new selection resets the filters
+    check_test_runs(test_runs)
+    session['test_runs'] = list(test_runs)
+    session['filters'] = {}
+
+
+def get_current_test_runs():
+    # the test runs selected in this session, by default the most recent test run
+    selected_test_runs = get_selected_test_runs()
+    if not selected_test_runs:
+        selected_test_runs = [current_app.extensions['run_catalog'].get_most_recent_run_name()]
+        select_test_runs(selected_test_runs)
+    return selected_test_runs
+
+
+def get_filters():
+    return session.get('filters', {})
+
+
+def set_filters(filters):
+    session['filters'] = filters
+
+
+def get_cache_key(test_run, run_key):
+    # in live mode a test run is cached by its name only, so that a new version replaces
+    # the previous one instead of piling up in the cache
+    if current_app.config['LIVE_MODE']:
+        return ('live', test_run)
+    return run_key
+
+
+def load_runs(selected_test_runs):
+    folder_path = current_app.config['DIR']
+    search_columns = current_app.config['SEARCH_COLUMNS']
+
+    # only read test runs from disk that are not kept in memory yet
+    run_cache = current_app.extensions['run_cache']
+    loaded_runs = {}
+    missing_runs = []
+    for test_run in selected_test_runs:
+        db_path = get_run_path(folder_path, test_run)
+        run_key = get_run_key(db_path)
+        cache_key = get_cache_key(test_run, run_key)
+        loaded_run = run_cache.get(cache_key)
+        if loaded_run is not None and loaded_run.key != run_key:
+            # live mode: the test run is still being written, only read its new rows
+            loaded_run = tail_test_run(loaded_run, db_path, search_columns)
+            run_cache.put(cache_key, loaded_run, loaded_run.nbytes)
+
+        if loaded_run is None:
+            missing_runs.append((db_path, test_run))
+        else:
+            loaded_runs[test_run] = loaded_run
+
+    # load the missing test runs in parallel
+    new_runs = load_test_runs(missing_runs,
+                              cache_dir=current_app.config['CACHE_DIR'],
+                              max_workers=current_app.config['LOAD_WORKERS'],
+                              search_columns=search_columns)
+    for loaded_run in new_runs:
+        run_cache.put(get_cache_key(loaded_run.name, loaded_run.key), loaded_run,
+                      loaded_run.nbytes)
+        loaded_runs[loaded_run.name] = loaded_run
+
+    return [loaded_runs[test_run] for test_run in selected_test_runs]
+
+
+def get_run_set(selected_test_runs):
+    # run sets are shared by all sessions that selected the same test runs
+    runs = load_runs(selected_test_runs)
+    run_cache = current_app.extensions['run_cache']
+    run_keys = tuple(run.key for run in runs)
+    if current_app.config['LIVE_MODE']:
+        cache_key = ('run_set', 'live') + tuple(selected_test_runs)
+    else:
+        cache_key = ('run_set',) + run_keys
+
+    run_set = run_cache.get(cache_key)
+    if run_set is None or run_set.key != run_keys:
+        run_set = build_run_set(runs)
+        # the run set holds on to its test runs, it is evicted together with any of them
+        run_cache.put(cache_key, run_set, run_set.nbytes,
+                      depends_on=[get_cache_key(run.name, run.key) for run in runs])
+    return run_set
+
+
+def get_query_runs(selected_test_runs):
+    # sidecar query databases of the selected test runs, built on first use
+    folder_path = current_app.config['DIR']
+    return [(test_run, build_query_db(get_run_path(folder_path, test_run),
+                                      current_app.config['CACHE_DIR']))
+            for test_run in selected_test_runs]
+
+
+def find_query_row(test_run, test_case_id):
+    # the given or first selected test run that contains the MTC, like in the memory mode
+    test_runs = [test_run] if test_run else get_current_test_runs()
+    for run_name, query_path in get_query_runs(test_runs):
+        row = query_row(query_path, test_case_id)
+        if row is not None:
+            return run_name, row
+    raise MtcNotFoundError(f"MTC {test_case_id} not found in the selected test runs")
+
+
+def find_test_case(test_run, test_case_id):
+    """
+    The test run and the summary columns of an MTC, in both query modes. Without a test
+    run, the first selected test run that contains the MTC is used. Unknown test runs and
+    MTCs raise RunNotFoundError and MtcNotFoundError.
+    """
+    if test_run:
+        check_test_runs([test_run])
+    if current_app.config['QUERY_MODE'] == 'sql':
+        return find_query_row(test_run, test_case_id)
+
+    # the run set of the selection if it contains the test run, else just the test run
+    selected_test_runs = get_current_test_runs()
+    if test_run and test_run not in selected_test_runs:
+        selected_test_runs = [test_run]
+    run_set = get_run_set(selected_test_runs)
+    df = run_set.df.iloc[[run_set.locate(test_run, test_case_id)]]
+    row = dict(zip(SUMMARY_COLUMNS, df_to_rows(df[SUMMARY_COLUMNS])[0]))
+    return df['test_run'].iat[0], row
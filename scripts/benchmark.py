@@ -0,0 +1,204 @@
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional, Tuple
+
+import click
+import pandas as pd
+
+from app import create_app
+from app.cache import LRUCache
+from app.loader import get_run_path, load_test_run
+from app.query import build_query_db, query_page
+from app.routes import get_df_from_db, paginate_df, process_df
+from app.runset import get_sorted_positions
+from app.search import search_runs
+from app.state import get_run_set
+from scripts.synthetic_run import generate_run, get_run_name
+
+DEFAULT_ROWS = (10000, 1000000, 10000000)
+
+# A measurement regresses if it is this much slower or larger than its baseline
+DEFAULT_TOLERANCE = 0.25
+
+# Smaller differences are noise, e.g. of the timer or of the allocator
+MIN_SECONDS = 0.005
+MIN_MB = 1.0
+
+
+def measure(func, repeat=3, setup=None, memory=True):
+    """
+    Best time of repeat calls of func, and the peak memory allocated by one more call.
+    The memory is traced in a call of its own since tracing slows down allocations.
+    setup is called before every call, outside of the measurement.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'peak_mb': peak_mb}
+
+
+def get_dataset(data_dir, rows, num_mrs, num_suts, blob_bytes, seed=0):
+    # generated test runs are kept in data_dir and reused by later benchmarks
+    name = f"rows-{rows}-mrs-{num_mrs}-suts-{num_suts}-blob-{blob_bytes}"
+    results_dir = Path(data_dir) / name
+    test_run = get_run_name()
+    if not (results_dir / test_run).exists():
+        generate_run(results_dir / test_run, rows, num_mrs, num_suts, blob_bytes, seed=seed)
+    return results_dir, test_run
+
+
+def run_benchmarks(results_dir, test_run, num_mrs, repeat=3, memory=True):
+    """
+    Time and memory-profile the data layer functions of the webapp on one test run:
+    loading it, computing the failure rates, filtering, searching and paginating it in
+    memory, and answering a page with SQL.
+    """
+    results_dir = Path(results_dir)
+    cache_dir = results_dir.with_name(results_dir.name + "_cache")
+    app = create_app(results_dir, cache_dir)
+    db_path = get_run_path(results_dir, test_run)
+    filters = {'mr_name': [f"mr_{mr}" for mr in range(0, num_mrs, 2)], 'sut_name': ['all'],
+               'test_result': ['passed', 'failed'], 'substring': None}
+
+    def reset_run_cache():
+        app.extensions['run_cache'] = LRUCache(app.extensions['run_cache'].max_bytes)
+
+    def load_selection():
+        with app.test_request_context():
+            get_df_from_db([test_run])
+
+    results = {}
+    results['load_test_run (database)'] = measure(
+        lambda: load_test_run(db_path, test_run), repeat, memory=memory)
+    load_selection()
+    results['get_df_from_db (cache)'] = measure(load_selection, repeat, setup=reset_run_cache,
+                                                memory=memory)
+
+    with app.test_request_context():
+        run_set = get_run_set([test_run])
+    positions = get_sorted_positions(run_set, filters)
+    page = max(len(positions) // 2 // app.config['PER_PAGE'], 1)
+
+    results['process_df'] = measure(lambda: process_df(run_set.df), repeat, memory=memory)
+    results['get_sorted_positions'] = measure(lambda: get_sorted_positions(run_set, filters),
+                                              repeat, memory=memory)
+    results['substring search'] = measure(lambda: search_runs(run_set.runs, "mtc_12"),
+                                          repeat, memory=memory)
+    with app.test_request_context(query_string={'page': page}):
+        results['paginate_df'] = measure(lambda: paginate_df(run_set.df, positions), repeat,
+                                         memory=memory)
+
+    query_runs = [(test_run, build_query_db(db_path, cache_dir))]
+    results['query_page'] = measure(
+        lambda: query_page(query_runs, filters, app.config['SEARCH_COLUMNS'], page,
+                           app.config['PER_PAGE']), repeat, memory=memory)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # the measurements that are slower or need more memory than their baseline
+    regressions = []
+    for rows, cases in results.items():
+        for case, result in cases.items():
+            base = baseline.get(rows, {}).get(case)
+            if base is None:
+                continue
+            if (result['seconds'] > base['seconds'] * (1 + tolerance)
+                    and result['seconds'] - base['seconds'] > MIN_SECONDS):
+                regressions.append(f"{case} at {rows} rows: {result['seconds']:.4f}s, "
+                                   f"baseline {base['seconds']:.4f}s")
+            if (result['peak_mb'] is not None and base.get('peak_mb') is not None
+                    and result['peak_mb'] > base['peak_mb'] * (1 + tolerance)
+                    and result['peak_mb'] - base['peak_mb'] > MIN_MB):
+                regressions.append(f"{case} at {rows} rows: {result['peak_mb']:.1f} MB, "
+                                   f"baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'rows':>10}  {'function':<26}{'time':>12}"
+             f"{'peak memory':>14}{'vs baseline':>14}"]
+    for rows, cases in results.items():
+        for case, result in cases.items():
+            peak = '' if result['peak_mb'] is None else f"{result['peak_mb']:.1f} MB"
+            base = (baseline or {}).get(rows, {}).get(case)
+            ratio = f"{result['seconds'] / base['seconds']:.2f}x" if base else ''
+            lines.append(f"{rows:>10}  {case:<26}{result['seconds'] * 1000:>10.1f}ms"
+                         f"{peak:>14}{ratio:>14}")
+    return "\n".join(lines)
+
+
+@click.command(help="Benchmark the data layer of the webapp on synthetic test runs")
+@click.option("--rows", "row_counts", type=click.IntRange(min=1), multiple=True,
+              default=DEFAULT_ROWS, show_default=True,
+              help="Number of MTCs of a benchmarked test run, can be given multiple times.")
+@click.option("--mrs", type=click.IntRange(min=1), default=20, show_default=True,
+              help="Number of distinct MRs.")
+@click.option("--suts", type=click.IntRange(min=1), default=5, show_default=True,
+              help="Number of distinct SUTs.")
+@click.option("--blob-bytes", type=click.IntRange(min=0), default=64, show_default=True,
+              help="Length of the serialized inputs and outputs of every MTC.")
+@click.option("--data-dir", type=click.Path(file_okay=False, path_type=Path),
+              default=Path(tempfile.gettempdir()) / "gemtest-webapp-benchmarks",
+              help="Directory the generated test runs are kept in.")
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True,
+              help="Number of timed calls per function, the best time is reported.")
+@click.option("--no-memory", is_flag=True, help="Do not trace the peak memory.")
+@click.option("--baseline", "baseline_path", type=click.Path(dir_okay=False, path_type=Path),
+              default=None, help="Compare with the results saved in this file.")
+@click.option("--save-baseline", "save_path", type=click.Path(dir_okay=False, path_type=Path),
+              default=None, help="Save the results to this file.")
+@click.option("--tolerance", type=click.FloatRange(min=0), default=DEFAULT_TOLERANCE,
+              show_default=True, help="Allowed slowdown or memory growth over the baseline.")
+def main(row_counts: Tuple[int, ...], mrs: int, suts: int, blob_bytes: int, data_dir: Path,
+         repeat: int, no_memory: bool, baseline_path: Optional[Path],
+         save_path: Optional[Path], tolerance: float) -> None:
+    baseline = None
+    if baseline_path is not None:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))['results']
+
+    results = {}
+    for rows in row_counts:
+        results_dir, test_run = get_dataset(data_dir, rows, mrs, suts, blob_bytes)
+        results[str(rows)] = run_benchmarks(results_dir, test_run, mrs, repeat,
+                                            memory=not no_memory)
+    click.echo(format_results(results, baseline))
+
+    if save_path is not None:
+        save_path.write_text(json.dumps({
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'mrs': mrs, 'suts': suts, 'blob_bytes': blob_bytes,
+            'results': results,
+        }, indent=2), encoding="utf-8")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import click
+import numpy as np
+
+# The mtc_results table as written by gemtest
+MTC_RESULTS_SCHEMA = """
+    CREATE TABLE mtc_results (
+        _id INTEGER PRIMARY KEY,
+        date DATETIME NOT NULL,
+        mtc_name TEXT NOT NULL,
+        mr_name TEXT NOT NULL,
+        sut_name TEXT NOT NULL,
+        source_inputs TEXT NOT NULL,
+        source_outputs TEXT NOT NULL,
+        followup_inputs TEXT NOT NULL,
+        followup_outputs TEXT NOT NULL,
+        transformation_name TEXT NOT NULL,
+        relation_name TEXT NOT NULL,
+        test_result TEXT NOT NULL,
+        relation_result TEXT NOT NULL,
+        parameters TEXT NOT NULL,
+        stdout TEXT NOT NULL,
+        stderr TEXT NOT NULL,
+        duration REAL NOT NULL
+    )
+"""
+
+RELATION_NAMES = ["equality", "approximately", "greater_than", "less_than"]
+
+# Distinct values per artifact column, rows pick one of them
+BLOB_POOL_SIZE = 1024
+
+BATCH_SIZE = 100000
+
+START_DATE = datetime(2024, 1, 1)
+
+
+def get_run_name(date=START_DATE):
+    # the name gemtest gives the database of a test run started at the given date
+    return f"metamorphic_test_run_{date:%Y-%m-%d_%H-%M-%S}.db"
+
+
+def get_blob_pool(rng, blob_bytes, size=BLOB_POOL_SIZE):
+    # random printable strings standing in for serialized inputs and outputs
+    alphabet = np.frombuffer(b"0123456789abcdefghijklmnopqrstuvwxyz.,[] ", dtype=np.uint8)
+    chars = rng.choice(alphabet, size=(size, blob_bytes))
+    return [row.tobytes().decode() for row in chars]
+
+
+def iter_rows(rows, num_mrs, num_suts, blob_bytes, failure_rate, skip_rate, seed,
+              batch_size=BATCH_SIZE):
+    """
+    Yield the rows of the mtc_results table, drawn in batches. A few MRs produce most MTCs
+    like in real test suites, every (MR, SUT) pair has a failure rate of its own around
+    failure_rate, and failed MTCs write to stdout.
+    """
+    rng = np.random.default_rng(seed)
+    mr_weights = 1 / np.arange(1, num_mrs + 1)
+    mr_weights /= mr_weights.sum()
+    group_failure_rates = np.clip(rng.uniform(0, 2 * failure_rate, (num_mrs, num_suts)), 0, 1)
+    relation_names = [RELATION_NAMES[mr % len(RELATION_NAMES)] for mr in range(num_mrs)]
+    pools = [get_blob_pool(rng, blob_bytes) for _ in range(4)]
+
+    for start in range(0, rows, batch_size):
+        size = min(batch_size, rows - start)
+        ids = np.arange(start + 1, start + size + 1)
+        mrs = rng.choice(num_mrs, size=size, p=mr_weights)
+        suts = rng.integers(num_suts, size=size)
+        skipped = rng.random(size) < skip_rate
+        failed = ~skipped & (rng.random(size) < group_failure_rates[mrs, suts])
+        factors = rng.integers(10, size=size)
+        blobs = rng.integers(BLOB_POOL_SIZE, size=(4, size))
+        durations = rng.lognormal(-7, 1, size)
+
+        for i in range(size):
+            mr = int(mrs[i])
+            test_result = 'skipped' if skipped[i] else 'failed' if failed[i] else 'passed'
+            yield (
+                int(ids[i]),
+                f"{START_DATE + timedelta(milliseconds=int(ids[i])):%Y-%m-%d %H:%M:%S}",
+                f"mtc_{ids[i]}",
+                f"mr_{mr}",
+                f"test_sut_{suts[i]}",
+                pools[0][blobs[0, i]],
+                pools[1][blobs[1, i]],
+                pools[2][blobs[2, i]],
+                pools[3][blobs[3, i]],
+                f"transform_{mr}",
+                relation_names[mr],
+                test_result,
+                'False' if failed[i] else 'True',
+                f'{{"factor": {factors[i]}}}' if mr % 3 == 0 else '{}',
+                f"relation {relation_names[mr]} violated\n" if failed[i] else '',
+                '',
+                float(durations[i]),
+            )
+
+
+def generate_run(db_path, rows, num_mrs=20, num_suts=5, blob_bytes=64, failure_rate=0.1,
+                 skip_rate=0.01, seed=0):
+    """
+    Write a synthetic test run database with the given number of MTCs, MRs and SUTs and
+    artifact columns of blob_bytes characters. The same arguments write the same rows.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(MTC_RESULTS_SCHEMA)
+        placeholders = ", ".join("?" * 17)
+        conn.executemany(f"INSERT INTO mtc_results VALUES ({placeholders})",
+                         iter_rows(rows, num_mrs, num_suts, blob_bytes, failure_rate,
+                                   skip_rate, seed))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+@click.command(help="Write a synthetic test run database for benchmarks")
+@click.option("--output-dir", type=click.Path(file_okay=False, path_type=Path),
+              default=Path("gemtest_results"), show_default=True,
+              help="The results directory the test run is written to.")
+@click.option("--rows", type=click.IntRange(min=1), default=10000, show_default=True,
+              help="Number of MTCs.")
+@click.option("--mrs", type=click.IntRange(min=1), default=20, show_default=True,
+              help="Number of distinct MRs.")
+@click.option("--suts", type=click.IntRange(min=1), default=5, show_default=True,
+              help="Number of distinct SUTs.")
+@click.option("--blob-bytes", type=click.IntRange(min=0), default=64, show_default=True,
+              help="Length of the serialized inputs and outputs of every MTC.")
+@click.option("--failure-rate", type=click.FloatRange(0, 1), default=0.1, show_default=True,
+              help="Average failure rate of the (MR, SUT) pairs.")
+@click.option("--seed", type=int, default=0, show_default=True)
+def main(output_dir: Path, rows: int, mrs: int, suts: int, blob_bytes: int,
+         failure_rate: float, seed: int) -> None:
+    db_path = generate_run(output_dir / get_run_name(datetime.now()), rows, mrs, suts,
+                           blob_bytes, failure_rate, seed=seed)
+    click.echo(f"Wrote {rows} MTCs to {db_path}")
@@ -0,0 +1,25 @@
+import pandas as pd
+from app.aggregation import compute_counters, format_failure_rate_table, merge_counters
+
+
+def test_merged_failure_rates():
+    """
+    Merging the failure counters of several test runs yields the same failure rate table
+    as aggregating the concatenated test runs, skipped test cases are not counted.
+    """
+    run_1 = pd.DataFrame({"mr_name": ["A", "A", "B", "B"],
+                          "sut_name": ["test_sin", "test_sin", "test_sin", "test_cos"],
+                          "test_result": ["failed", "passed", "skipped", "failed"]})
+    run_2 = pd.DataFrame({"mr_name": ["A", "B"],
+                          "sut_name": ["test_sin", "test_cos"],
+                          "test_result": ["failed", "passed"]})
+
+    merged = merge_counters([compute_counters(run_1), compute_counters(run_2)])
+    assert merged.loc[("A", "test_sin")].tolist() == [2, 3]
+    assert merged.loc[("B", "test_cos")].tolist() == [1, 2]
+
+    df_fr = format_failure_rate_table(merged)
+    assert df_fr.equals(format_failure_rate_table(compute_counters(pd.concat([run_1, run_2]))))
+    assert df_fr.loc["A", "sin"] == "66.67%"
+    assert df_fr.loc["B", "sin"] == "-"
+    assert df_fr.loc["average", "cos"] == "50.0%"
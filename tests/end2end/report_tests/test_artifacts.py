@@ -0,0 +1,25 @@
+from app.artifacts import ArtifactManifest
+
+
+def test_artifact_manifest(tmp_path):
+    """
+    The artifact manifest knows the files below the artifact root without a file system
+    access per lookup, picks up new files and rejects paths outside of the root.
+    """
+    root = tmp_path / "static"
+    (root / "img" / "mr_a").mkdir(parents=True)
+    (root / "img" / "input_1.png").touch()
+    (root / "img" / "mr_a" / "output_1.png").touch()
+    (tmp_path / "secret.txt").touch()
+
+    manifest = ArtifactManifest(root, poll_interval=0)
+    assert manifest.contains("img/input_1.png")
+    assert manifest.contains("./img/mr_a/output_1.png")
+    assert not manifest.contains("img/input_2.png")
+    assert not manifest.contains("img")
+    assert not manifest.contains("../secret.txt")
+    assert not manifest.contains("0.5440211108893698")
+
+    (root / "img" / "mr_a" / "output_2.png").touch()
+    assert manifest.contains("img/mr_a/output_2.png")
+    assert len(manifest) == 3
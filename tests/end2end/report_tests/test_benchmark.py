@@ -0,0 +1,31 @@
+from app.loader import get_run_path, load_test_run
+from scripts.benchmark import compare, get_dataset, run_benchmarks
+
+
+def test_synthetic_run_benchmarks(tmp_path):
+    """
+    The generator writes test runs with the requested number of MTCs, MRs and SUTs, the
+    benchmark suite measures every data layer function on them and reports measurements
+    that are slower than their baseline.
+    """
+    results_dir, test_run = get_dataset(tmp_path, 2000, num_mrs=4, num_suts=3, blob_bytes=16)
+    run = load_test_run(get_run_path(results_dir, test_run), test_run)
+    assert len(run.df) == 2000
+    assert run.df["mr_name"].nunique() == 4 and run.df["sut_name"].nunique() == 3
+    failed = run.df["test_result"] == "failed"
+    assert run.df.loc[failed, "relation_result"].eq(False).all()
+    assert run.counters["failed"].sum() == failed.sum()
+
+    results = {"2000": run_benchmarks(results_dir, test_run, 4, repeat=1, memory=False)}
+    assert set(results["2000"]) == {"load_test_run (database)", "get_df_from_db (cache)",
+                                    "process_df", "get_sorted_positions", "substring search",
+                                    "paginate_df", "query_page"}
+    assert compare(results, results) == []
+
+    baseline = {"2000": {"process_df": {"seconds": 0.5, "peak_mb": 100.0},
+                         "paginate_df": {"seconds": 0.5, "peak_mb": 100.0}}}
+    current = {"2000": {"process_df": {"seconds": 1.0, "peak_mb": 110.0},
+                        "paginate_df": {"seconds": 0.55, "peak_mb": 200.0}}}
+    assert compare(current, baseline) == [
+        "process_df at 2000 rows: 1.0000s, baseline 0.5000s",
+        "paginate_df at 2000 rows: 200.0 MB, baseline 100.0 MB"]
@@ -0,0 +1,51 @@
+import pandas as pd
+from app.cache import LRUCache, estimate_df_bytes
+
+
+def test_run_lru_cache():
+    """
+    The in-memory run cache evicts the least recently used runs once the memory budget
+    is exceeded and does not keep runs that are larger than the whole budget.
+    """
+    df = pd.DataFrame({"_id": range(100), "mr_name": ["A"] * 100})
+    nbytes = estimate_df_bytes(df)
+
+    run_cache = LRUCache(max_bytes=2 * nbytes)
+    run_cache.put("run_1", df, nbytes)
+    run_cache.put("run_2", df, nbytes)
+    assert run_cache.get("run_1") is df
+
+    # run_2 is now the least recently used run and gets evicted
+    run_cache.put("run_3", df, nbytes)
+    assert "run_1" in run_cache and "run_3" in run_cache
+    assert "run_2" not in run_cache
+    assert run_cache.size == 2 * nbytes
+
+    run_cache.put("run_4", df, 3 * nbytes)
+    assert "run_4" not in run_cache
+
+
+def test_lru_cache_dependencies():
+    """
+    A value that holds on to other cached values is evicted together with any of them and
+    is not cached without them, so the cache never keeps more than its budget alive.
+    """
+    run_cache = LRUCache(max_bytes=100)
+    run_cache.put("run_1", "df_1", 40)
+    run_cache.put("run_2", "df_2", 40)
+    run_cache.put("run_set", "df_1 + df_2", 10, depends_on=["run_1", "run_2"])
+    assert "run_set" in run_cache and run_cache.size == 90
+
+    # run_1 is the least recently used value, the run set is evicted with it
+    run_cache.put("run_3", "df_3", 40)
+    assert "run_1" not in run_cache and "run_set" not in run_cache
+    assert run_cache.size == 80
+
+    run_cache.put("run_set", "df_1 + df_2", 10, depends_on=["run_1", "run_2"])
+    assert "run_set" not in run_cache
+
+    # a new version of a test run replaces the run sets built from the previous one
+    run_cache.put("run_set", "df_2 + df_3", 10, depends_on=["run_2", "run_3"])
+    run_cache.put("run_2", "df_2 v2", 40)
+    assert "run_set" not in run_cache
+    assert run_cache.size == 80
@@ -0,0 +1,36 @@
+from app.catalog import RunCatalog
+
+
+def test_run_catalog(tmp_path):
+    """
+    The run catalog lists the test run databases newest first, ignores other files such as
+    SQLite journals and picks up new test runs.
+    """
+    for name in ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-01.db-journal",
+                 "metamorphic_test_run_2024-09-23_12-00-00.db",
+                 "notes.txt"]:
+        (tmp_path / name).touch()
+    (tmp_path / "metamorphic_test_run_2024-09-25_00-00-00.db").mkdir()
+
+    catalog = RunCatalog(tmp_path, poll_interval=0)
+    assert catalog.get_sorted_files() == ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                                          "metamorphic_test_run_2024-09-23_12-00-00.db"]
+
+    (tmp_path / "metamorphic_test_run_2024-09-24_00-00-02.db").touch()
+    assert catalog.get_most_recent_run_name() == "metamorphic_test_run_2024-09-24_00-00-02.db"
+
+
+def test_run_catalog_has_run(tmp_path):
+    """
+    A test run written since the last listing is found, other files and paths are not.
+    """
+    catalog = RunCatalog(tmp_path, poll_interval=3600)
+    assert catalog.get_sorted_files() == []
+
+    (tmp_path / "metamorphic_test_run_2024-09-24_00-00-01.db").touch()
+    (tmp_path / "notes.txt").touch()
+    assert catalog.has_run("metamorphic_test_run_2024-09-24_00-00-01.db")
+    assert not catalog.has_run("notes.txt")
+    assert not catalog.has_run("../metamorphic_test_run_2024-09-24_00-00-01.db")
+    assert not catalog.has_run("metamorphic_test_run_2024-09-24_00-00-02.db")
@@ -8,9 +8,9 @@ from app import create_app
 from app.run import default_dir
 
 @pytest.fixture(scope="module")
-def app():
+def app(tmp_path_factory):
     """Fixture to create a Flask app instance."""
-    flask_app = create_app(default_dir)
+    flask_app = create_app(default_dir, tmp_path_factory.mktemp("cache"), scan_interval=0)
 
     # Configure the app for testing
     flask_app.config["TESTING"] = True
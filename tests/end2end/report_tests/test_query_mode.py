@@ -0,0 +1,221 @@
+import io
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+from app import create_app
+from app.loader import get_run_path
+from app.query import build_query_db, query_page
+from app.run import default_dir
+
+tests_end2end_path = Path(__file__).parent.parent
+project_root_path = tests_end2end_path.parent.parent
+
+test_run_01 = "metamorphic_test_run_2024-09-24_00-00-01.db"
+test_run_02 = "metamorphic_test_run_2024-09-24_00-00-02.db"
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    """Fixture to create a Flask app instance that answers report pages with SQL."""
+    flask_app = create_app(default_dir, tmp_path_factory.mktemp("cache"), query_mode="sql",
+                           scan_interval=0)
+
+    # Configure the app for testing
+    flask_app.config["TESTING"] = True
+
+    yield flask_app
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    """Fixture to create a Flask test client."""
+    with app.test_client() as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def mock_test_run_file():
+    """Fixture to copy test run files from test_data to the test_results directory."""
+    test_results_dir = project_root_path / "gemtest_results"
+
+    if test_results_dir.exists():
+        shutil.rmtree(test_results_dir)
+    os.makedirs(test_results_dir, exist_ok=True)
+
+    for test_run in [test_run_01, test_run_02]:
+        shutil.copy(tests_end2end_path / "test_data" / test_run, test_results_dir / test_run)
+
+    yield
+
+    shutil.rmtree(test_results_dir)
+
+
+def test_select_and_filter(client, mock_test_run_file):
+    """
+    In query mode the selection, filters and pagination show the same MTCs as in memory mode.
+    """
+    response = client.get("/select", query_string={"test_run": test_run_01})
+    assert response.status_code == 200
+    assert "Number of executed test cases: 120" in response.get_data(as_text=True)
+
+    filters = {"mr_name": "A_parameters", "sut_name": "test_sin", "test_result": "passed"}
+    for page in [1, 2, 3, 4]:
+        response = client.get("/filter", query_string={**filters, "page": page})
+        soup = BeautifulSoup(response.data, "html.parser")
+
+        mtc_links = soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+        assert len(mtc_links) == 20
+
+        for link in mtc_links:
+            columns = link.find_parent("tr").find_all("td")
+            assert columns[1].text == filters["test_result"]
+            assert columns[2].text == filters["mr_name"]
+            assert columns[3].text == filters["sut_name"]
+
+    response = client.get("/mtc_detail_view/1")
+    assert response.status_code == 200
+    assert "System Under Test: test_sin" in response.get_data(as_text=True)
+
+
+def test_query_page_across_runs(app, mock_test_run_file):
+    """
+    Pages that span several test runs are sliced in the order relation_result, run, _id.
+    """
+    runs = []
+    expected = []
+    for run_index, test_run in enumerate([test_run_01, test_run_02]):
+        db_path = get_run_path(default_dir, test_run)
+        runs.append((test_run, build_query_db(db_path, app.config["CACHE_DIR"])))
+
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT _id, relation_result FROM mtc_results")
+        for _id, relation_result in rows:
+            order = {"False": 0, "True": 1}.get(relation_result, 2)
+            expected.append((order, run_index, _id))
+        conn.close()
+    expected_ids = [_id for _, _, _id in sorted(expected)]
+
+    ids = []
+    page = 1
+    while True:
+        df_page, total = query_page(runs, {}, ["mtc_name"], page, 7)
+        if df_page.empty:
+            break
+        ids.extend(df_page["_id"].tolist())
+        page += 1
+
+    assert total == len(expected_ids)
+    assert ids == expected_ids
+
+
+def test_artifact_search(client, mock_test_run_file):
+    """
+    In query mode the artifact search restricts the SQL query to the ids found in the
+    FTS sidecar index, detail links carry the test run of the MTC.
+    """
+    client.get("/select", query_string={"test_run": [test_run_01, test_run_02]})
+    response = client.get("/filter", query_string={"substring": "zzz_not_found",
+                                                   "search_mode": "artifacts"})
+    soup = BeautifulSoup(response.data, "html.parser")
+    assert not soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+
+    response = client.get("/filter", query_string={"sut_name": "test_add"})
+    soup = BeautifulSoup(response.data, "html.parser")
+    mtc_links = soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+    assert len(mtc_links) == 4
+
+    response = client.get(mtc_links[0]["href"])
+    assert "System Under Test: test_add" in response.get_data(as_text=True)
+
+
+def test_json_api_keyset_pagination(app, client, mock_test_run_file):
+    """
+    In query mode the cursor pages of the JSON API contain the same MTCs in the same order
+    as the report pages.
+    """
+    client.get("/select", query_string={"test_run": [test_run_01, test_run_02]})
+    runs = [(test_run, build_query_db(get_run_path(app.config["DIR"], test_run),
+                                      app.config["CACHE_DIR"]))
+            for test_run in [test_run_01, test_run_02]]
+    expected, total = query_page(runs, {}, app.config["SEARCH_COLUMNS"], 1, 1000)
+
+    rows = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get("/api/filter", query_string={"limit": 25, "cursor": cursor})
+        page = page.get_json()
+        rows.extend(page["rows"])
+        cursor = page["next_cursor"]
+
+    assert page["total"] == total == 124
+    expected_keys = list(zip(expected["test_run"], expected["_id"]))
+    assert [(row[1], row[0]) for row in rows] == expected_keys
+    assert client.get("/api/mtc_detail_view/9999").status_code == 404
+    for test_run in ["unknown.db", "../" + test_run_01]:
+        query_string = {"test_run": test_run}
+        assert client.get("/mtc_detail_view/1", query_string=query_string).status_code == 404
+        response = client.get("/api/mtc_detail_view/1", query_string=query_string)
+        assert response.status_code == 404
+
+
+def test_bulk_export(client, mock_test_run_file):
+    """
+    In query mode the bulk export reads the filtered MTCs chunk by chunk with SQL and
+    contains the same rows as the JSON API.
+    """
+    client.get("/select", query_string={"test_run": [test_run_01, test_run_02]})
+    filters = {"mr_name": ["A", "B"], "columns": "mr_name,relation_result"}
+    expected = client.get("/api/filter", query_string=dict(filters, limit=1000)).get_json()
+
+    response = client.get("/export/mtcs", query_string=dict(filters, format="csv"))
+    df_csv = pd.read_csv(io.StringIO(response.get_data(as_text=True)))
+    assert df_csv.values.tolist() == expected["rows"]
+    assert len(df_csv) == 44
+
+    # filters that match no MTC export the header row only
+    response = client.get("/export/mtcs",
+                          query_string=dict(filters, format="csv", mr_name="unknown"))
+    assert response.get_data(as_text=True) == "_id,test_run,mr_name,relation_result\n"
+
+
+def test_same_values_as_memory_mode(client, mock_test_run_file, tmp_path):
+    """
+    The JSON API returns the same values in both query modes, e.g. durations are not
+    rounded in memory.
+    """
+    memory_client = create_app(default_dir, tmp_path, scan_interval=0).test_client()
+    query_string = {"test_run": test_run_01, "columns": "mr_name,relation_result,duration",
+                    "limit": 200}
+    expected = memory_client.get("/api/filter", query_string=query_string).get_json()
+    assert client.get("/api/filter", query_string=query_string).get_json() == expected
+
+    for test_case_id in [1, 60]:
+        url = f"/api/mtc_detail_view/{test_case_id}"
+        expected = memory_client.get(url, query_string={"test_run": test_run_01}).get_json()
+        response = client.get(url, query_string={"test_run": test_run_01})
+        assert response.get_json() == expected
+
+
+def test_default_cache_dir(tmp_path, monkeypatch):
+    """
+    With relative results and cache dirs, as given on the command line, the sidecar
+    databases are still opened read-only by file URI.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("gemtest_results")
+    shutil.copy(tests_end2end_path / "test_data" / test_run_01,
+                Path("gemtest_results") / test_run_01)
+
+    flask_app = create_app(Path("gemtest_results"), query_mode="sql", scan_interval=0)
+    assert flask_app.config["CACHE_DIR"] == tmp_path.resolve() / "gemtest_results_cache"
+
+    client = flask_app.test_client()
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "Number of executed test cases: 120" in response.get_data(as_text=True)
+    assert client.get("/api/filter", query_string={"limit": 5}).status_code == 200
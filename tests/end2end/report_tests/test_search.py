@@ -0,0 +1,19 @@
+import pandas as pd
+from app.search import SearchIndex
+
+
+def test_substring_search_index():
+    """
+    The search index finds the same rows as a case-insensitive substring search over the
+    string representation of every searchable cell.
+    """
+    df = pd.DataFrame({"mtc_name": ["Shift_1", "shift_2", "scale_1", "scale_2"],
+                       "relation_result": [True, False, float("nan"), True],
+                       "duration": [0.5, 1.25, 0.5, 2.0]})
+    index = SearchIndex(df, ["mtc_name", "relation_result", "duration"])
+    # DataFrame.map replaces applymap since pandas 2.1, pandas 1.x only has applymap
+    map_cells = df.map if hasattr(df, "map") else df.applymap
+
+    for substring in ["SHIFT", "_1", "true", "nan", "1.2", "0.5", "missing"]:
+        expected = map_cells(lambda cell: substring.lower() in str(cell).lower()).any(axis=1)
+        assert index.match(substring).tolist() == expected.tolist(), substring
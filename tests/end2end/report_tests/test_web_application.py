@@ -1,19 +1,37 @@
+import gzip
+import io
+import json
 import os
 import shutil
+import sqlite3
+import warnings
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 import pytest
 from bs4 import BeautifulSoup
 from app import create_app
+from app.artifacts import ArtifactManifest
+from app.cache import ARROW_AVAILABLE, get_cache_path
+from app.export import iter_csv, iter_run_set_chunks
+from app.fts import FTS_SUFFIX, search_artifacts
+from app.loader import (ARTIFACT_COLUMNS, SUMMARY_DTYPES, get_run_path, get_test_results_df,
+                        load_test_run)
+from app.routes import get_page_window
 from app.run import default_dir
+from app.runset import build_run_set, get_filter_key
+from app.search import ChunkedSearchIndex
+from app.serve import preload
+from app.state import get_run_set
 
 tests_end2end_path = Path(__file__).parent.parent
 project_root_path = tests_end2end_path.parent.parent
 
 @pytest.fixture(scope="module")
-def app():
+def app(tmp_path_factory):
     """Fixture to create a Flask app instance."""
-    flask_app = create_app(default_dir)
+    flask_app = create_app(default_dir, tmp_path_factory.mktemp("cache"), scan_interval=0)
 
     # Configure the app for testing
     flask_app.config["TESTING"] = True
@@ -293,3 +311,673 @@ def test_detail_view(client):
         # Find the span with the content "passed"
         result_span = soup.find("span", string=lambda x: "passed" in x if x else False)
         assert "passed" in result_span.text
+
+
+def test_summary_columns_only(app, client, mock_test_run_file):
+    """
+    The report only loads the summary columns of a test run, the artifact columns are
+    fetched from the database when the detail view of a single MTC is opened.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    client.get("/select", query_string={"test_run": test_run})
+    with app.test_request_context():
+        assert not set(ARTIFACT_COLUMNS) & set(get_run_set([test_run]).df.columns)
+
+    response = client.get("/mtc_detail_view/1")
+    assert response.status_code == 200
+    assert "Standard Output:" in response.get_data(as_text=True)
+
+
+def test_columnar_cache(app, client, mock_test_run_file):
+    """
+    Loading a test run writes a columnar cache entry keyed by the database file,
+    subsequent loads of the unchanged database read the cache instead.
+    """
+    if not ARROW_AVAILABLE:
+        pytest.skip("pyarrow is not installed")
+
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    client.get("/select", query_string={"test_run": test_run})
+
+    cache_dir = app.config["CACHE_DIR"]
+    db_path = get_run_path(default_dir, test_run)
+    assert get_cache_path(cache_dir, db_path).exists()
+
+    cached_run = load_test_run(db_path, test_run, cache_dir)
+    assert len(cached_run.df) == 120
+    assert set(cached_run.df["test_run"]) == {test_run}
+    assert cached_run.df["mr_name"].dtype == "category"
+
+
+def test_compact_dtypes(app, mock_test_run_file):
+    """
+    Loaded test runs store names and results as categoricals and relation_result as
+    booleans, also after concatenating runs with different categories.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    runs = [load_test_run(get_run_path(default_dir, test_run), test_run)
+            for test_run in test_runs]
+    for run in runs:
+        for col, dtype in SUMMARY_DTYPES.items():
+            assert run.df[col].dtype == dtype
+        assert run.df["test_run"].dtype == "category"
+
+        usage = run.memory_usage()
+        assert usage["mr_name"] == run.df["mr_name"].memory_usage(index=False, deep=True)
+        assert usage.sum() == run.nbytes - run.df.index.memory_usage()
+
+    with sqlite3.connect(get_run_path(default_dir, test_runs[0])) as conn:
+        df = get_test_results_df(conn)
+    df_object = df.astype({col: object for col in SUMMARY_DTYPES})
+    assert df.memory_usage(deep=True).sum() < df_object.memory_usage(deep=True).sum() / 2
+
+    run_set = build_run_set(runs)
+    assert run_set.df["mr_name"].dtype == "category"
+    assert run_set.df["test_run"].dtype == "category"
+    assert run_set.df["relation_result"].dtype == "boolean"
+    assert run_set.df["mr_name"].tolist() == (runs[0].df["mr_name"].tolist()
+                                              + runs[1].df["mr_name"].tolist())
+    assert run_set.metadata[0] == 124
+
+
+def test_select_multiple_test_runs(client, mock_test_run_file):
+    """
+    Selecting several test runs loads them in parallel and merges all of their MTCs.
+    """
+    response = client.get(
+        "/select",
+        query_string={"test_run": ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                                   "metamorphic_test_run_2024-09-24_00-00-02.db"]},
+    )
+    assert response.status_code == 200
+    assert "Number of executed test cases: 124" in response.get_data(as_text=True)
+
+
+def test_export_latex(client, mock_test_run_file):
+    """
+    The failure rate table of the selected test runs can be exported as LaTeX.
+    """
+    response = client.get(
+        "/export/latex",
+        query_string={"test_run": "metamorphic_test_run_2024-09-24_00-00-02.db"},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-tex"
+
+    latex = response.get_data(as_text=True)
+    assert latex.startswith("\\begin{tabular}")
+    assert "add" in latex
+
+
+def test_substring_filter(client, mock_test_run_file):
+    """
+    The substring filter only shows the MTCs whose report columns contain the substring.
+    """
+    client.get(
+        "/select",
+        query_string={"test_run": "metamorphic_test_run_2024-09-24_00-00-01.db"},
+    )
+    response = client.get("/filter", query_string={"substring": "A_PARAM"})
+    soup = BeautifulSoup(response.data, "html.parser")
+
+    mr_cells = [row.find_all("td")[2].text
+                for row in soup.find_all("tr") if len(row.find_all("td")) == 5]
+    assert mr_cells and set(mr_cells) == {"A_parameters"}
+
+
+def test_artifact_search(app, client, mock_test_run_file):
+    """
+    Searching in artifacts queries the FTS sidecar index of the selected test run and
+    finds the same MTCs as a substring search over the stored artifact columns.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    db_path = get_run_path(default_dir, test_run)
+
+    conn = sqlite3.connect(db_path)
+    source_input = conn.execute(
+        "SELECT source_inputs FROM mtc_results WHERE _id = 1").fetchone()[0]
+    expected_ids = sorted(
+        row[0] for row in conn.execute("SELECT _id, source_inputs FROM mtc_results")
+        if source_input.lower() in row[1].lower())
+    conn.close()
+
+    cache_dir = app.config["CACHE_DIR"]
+    assert sorted(search_artifacts(db_path, cache_dir, source_input)) == expected_ids
+    assert list(Path(cache_dir).glob(f"{test_run}-*{FTS_SUFFIX}"))
+
+    client.get("/select", query_string={"test_run": test_run})
+    response = client.get(
+        "/filter", query_string={"substring": source_input, "search_mode": "artifacts"})
+    soup = BeautifulSoup(response.data, "html.parser")
+    mtc_links = soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+    assert len(mtc_links) == min(len(expected_ids), 20)
+
+
+def test_filter_result_cache(app, client, mock_test_run_file):
+    """
+    The sorted positions of a filter result are cached per selection and filters, so
+    switching pages reuses them instead of filtering and sorting again.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    client.get("/select", query_string={"test_run": test_run})
+    with app.test_request_context():
+        run_set = get_run_set([test_run])
+    filters = {"mr_name": ["A_parameters"], "sut_name": ["test_sin"],
+               "test_result": ["passed"], "substring": "", "search_mode": "report"}
+    client.get("/filter", query_string=filters)
+
+    result_cache = app.extensions["result_cache"]
+    cache_key = (run_set.key, get_filter_key(filters))
+    positions = result_cache.get(cache_key)
+    assert len(positions) == 80
+
+    response = client.get("/filter", query_string={**filters, "page": 2})
+    assert result_cache.get(cache_key) is positions
+
+    soup = BeautifulSoup(response.data, "html.parser")
+    mtc_links = soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+    expected_ids = run_set.df.iloc[positions[20:40]]["_id"].tolist()
+    link_ids = [int(link["href"].split("/")[-1].split("?")[0]) for link in mtc_links]
+    assert link_ids == expected_ids
+
+
+def test_detail_view_multiple_test_runs(client, mock_test_run_file):
+    """
+    MTC ids are only unique within a test run. With several selected test runs, the
+    detail links carry the test run and the detail view shows the MTC of that run.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    client.get("/select", query_string={"test_run": test_runs})
+
+    response = client.get("/filter", query_string={"sut_name": "test_add"})
+    soup = BeautifulSoup(response.data, "html.parser")
+    mtc_links = soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)
+    assert len(mtc_links) == 4
+    assert all(f"test_run={test_runs[1]}" in link["href"] for link in mtc_links)
+
+    for test_run, sut_name in zip(test_runs, ["test_sin", "test_add"]):
+        response = client.get("/mtc_detail_view/1", query_string={"test_run": test_run})
+        text = response.get_data(as_text=True)
+        assert f"System Under Test: {sut_name}" in text
+        assert f"Test Run: {test_run}" in text
+
+    # only test runs of the results dir are looked up, no other files
+    for test_run in ["unknown.db", "../" + test_runs[0]]:
+        query_string = {"test_run": test_run}
+        assert client.get("/mtc_detail_view/1", query_string=query_string).status_code == 404
+        response = client.get("/api/mtc_detail_view/1", query_string=query_string)
+        assert response.status_code == 404
+
+
+def test_sessions_are_independent(app, mock_test_run_file):
+    """
+    Two users select different test runs, each of them keeps seeing their own selection.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    client_01 = app.test_client()
+    client_02 = app.test_client()
+    client_01.get("/select", query_string={"test_run": test_runs[0]})
+    client_02.get("/select", query_string={"test_run": test_runs[1]})
+
+    response = client_01.get("/?page=1")
+    assert "Number of executed test cases: 120" in response.get_data(as_text=True)
+
+    response = client_02.get("/?page=1")
+    assert "Number of executed test cases: 4" in response.get_data(as_text=True)
+
+
+def test_unknown_test_runs(tmp_path):
+    """
+    Test run names that are not listed in the results dir are answered with 404, a
+    selected test run that is deleted later is dropped from the selection.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    results_dir = tmp_path / "gemtest_results"
+    results_dir.mkdir()
+    for test_run in test_runs:
+        shutil.copy(tests_end2end_path / "test_data" / test_run, results_dir / test_run)
+
+    flask_app = create_app(results_dir, tmp_path / "cache", scan_interval=0)
+    client = flask_app.test_client()
+    for test_run in ["metamorphic_test_run_2000-01-01_00-00-00.db", "../" + test_runs[0]]:
+        assert client.get("/select", query_string={"test_run": test_run}).status_code == 404
+        response = client.get("/api/filter", query_string={"test_run": test_run})
+        assert response.status_code == 404
+
+    response = client.get("/select", query_string={"test_run": test_runs[0]})
+    assert "Number of executed test cases: 120" in response.get_data(as_text=True)
+    os.remove(results_dir / test_runs[0])
+    response = client.get("/?page=1")
+    assert response.status_code == 200
+    assert "Number of executed test cases: 4" in response.get_data(as_text=True)
+
+
+def test_preload(tmp_path, mock_test_run_file):
+    """
+    Before serving with several workers, the most recent test run is loaded into the
+    run cache of the main process.
+    """
+    flask_app = create_app(default_dir, tmp_path, scan_interval=0)
+    assert len(flask_app.extensions["run_cache"]) == 0
+
+    preload(flask_app)
+    assert len(flask_app.extensions["run_cache"]) == 2  # the test run and its run set
+
+
+def test_live_mode(tmp_path):
+    """
+    In live mode, a test run that is still being written is brought up to date by reading
+    only its new MTCs, the counters and failure rates match a full load of the test run.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    results_dir = tmp_path / "gemtest_results"
+    results_dir.mkdir()
+    db_path = results_dir / test_run
+    shutil.copy(tests_end2end_path / "test_data" / test_run, db_path)
+
+    # only the first half of the MTCs has been executed
+    conn = sqlite3.connect(db_path)
+    executed = conn.execute("SELECT * FROM mtc_results WHERE _id > 60").fetchall()
+    conn.execute("DELETE FROM mtc_results WHERE _id > 60")
+    conn.commit()
+
+    flask_app = create_app(results_dir, tmp_path / "cache", live=True)
+    with flask_app.test_request_context():
+        assert get_run_set([test_run]).metadata[0] == 60
+
+        # gemtest appends the remaining MTCs in two batches
+        for batch in (executed[:30], executed[30:]):
+            placeholders = ", ".join("?" * len(batch[0]))
+            conn.executemany(f"INSERT INTO mtc_results VALUES ({placeholders})", batch)
+            conn.commit()
+            get_run_set([test_run])
+        conn.close()
+
+        # a database that changed without new MTCs keeps the loaded MTCs
+        stat = os.stat(db_path)
+        os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            run_set = get_run_set([test_run])
+        assert run_set.runs[0].key[2] == stat.st_mtime_ns + 10 ** 9
+        assert run_set.runs[0].id_index.dtype == "int64"
+
+        run_set = get_run_set([test_run])
+        full_run_set = build_run_set([load_test_run(db_path, test_run)])
+        live_run, full_run = run_set.runs[0], full_run_set.runs[0]
+        assert run_set.df["_id"].tolist() == list(range(1, 121))
+        assert run_set.metadata == full_run_set.metadata
+        assert run_set.df_fr.equals(full_run_set.df_fr)
+        assert live_run.counters.equals(full_run.counters)
+
+        # the new rows are indexed in chunks, which find the same MTCs as a full index
+        assert isinstance(live_run.search_index, ChunkedSearchIndex)
+        assert (live_run.search_index.match("sin") == full_run.search_index.match("sin")).all()
+
+    # the live test run and its run set replace their previous versions in the cache
+    assert len(flask_app.extensions["run_cache"]) == 2
+
+
+def test_progress_stream(tmp_path):
+    """
+    The progress stream sends the counters and all failure rates first, and later only the
+    failure rates of the groups that changed while the test run was executed.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    results_dir = tmp_path / "gemtest_results"
+    results_dir.mkdir()
+    db_path = results_dir / test_run
+    shutil.copy(tests_end2end_path / "test_data" / test_run, db_path)
+
+    conn = sqlite3.connect(db_path)
+    executed = conn.execute("SELECT * FROM mtc_results WHERE _id > 110").fetchall()
+    conn.execute("DELETE FROM mtc_results WHERE _id > 110")
+    conn.commit()
+
+    flask_app = create_app(results_dir, tmp_path / "cache", live=True)
+    flask_app.config["PROGRESS_INTERVAL"] = 0.01
+    response = flask_app.test_client().get("/progress", query_string={"test_run": test_run})
+    assert response.mimetype == "text/event-stream"
+
+    def next_event(chunks):
+        for chunk in chunks:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith("event: progress"):
+                return json.loads(chunk.split("data: ", 1)[1])
+        return None
+
+    chunks = iter(response.response)
+    first = next_event(chunks)
+    assert first["counters"]["total"] == 110
+    assert len(first["failure_rates"]) == 3
+
+    # the last MTCs of the run all belong to MR B
+    conn.executemany(f"INSERT INTO mtc_results VALUES ({', '.join('?' * len(executed[0]))})",
+                     executed)
+    conn.commit()
+    conn.close()
+
+    second = next_event(chunks)
+    response.close()
+    assert second["counters"]["total"] == 120
+    assert [(rate["mr_name"], rate["sut_name"]) for rate in second["failure_rates"]] == [
+        ("B", "test_sin")]
+
+
+def test_progress_stream_limit(tmp_path):
+    """
+    Progress streams beyond the limit are refused with 503 so that they cannot occupy all
+    server threads, a closed stream frees its slot.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    results_dir = tmp_path / "gemtest_results"
+    results_dir.mkdir()
+    shutil.copy(tests_end2end_path / "test_data" / test_run, results_dir / test_run)
+
+    flask_app = create_app(results_dir, tmp_path / "cache", live=True, max_streams=1)
+    client = flask_app.test_client()
+    stream_limiter = flask_app.extensions["progress_streams"]
+
+    first = client.get("/progress", query_string={"test_run": test_run})
+    assert first.status_code == 200 and len(stream_limiter) == 1
+
+    refused = client.get("/progress", query_string={"test_run": test_run})
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"] == "30"
+
+    first.close()
+    assert len(stream_limiter) == 0
+    second = client.get("/progress", query_string={"test_run": test_run})
+    assert second.status_code == 200
+    second.close()
+
+
+def test_json_api(client, mock_test_run_file):
+    """
+    The JSON API returns the summary of a selection, pages through the filtered MTCs with
+    a cursor in the order of the report and returns the artifacts of single MTCs.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    summary = client.get("/api/select", query_string={"test_run": test_runs}).get_json()
+    assert summary["counters"]["total"] == 124
+    assert {rate["mr_name"] for rate in summary["failure_rates"]} == {"A", "A_parameters", "B"}
+
+    # walk all pages of the report of the selected test runs
+    filters = {"mr_name": ["A", "B"], "test_result": "passed"}
+    response = client.get("/filter", query_string=filters)
+    soup = BeautifulSoup(response.data, "html.parser")
+    report_ids = [a["href"].split("/")[-1].split("?")[0] for a in soup.find_all("a", href=True)
+                  if "mtc_detail_view" in a["href"]]
+
+    rows = []
+    cursor = None
+    while True:
+        page = client.get("/api/filter", query_string=dict(
+            filters, columns="mr_name,relation_result", limit=7, cursor=cursor or ""))
+        page = page.get_json()
+        assert page["columns"] == ["_id", "test_run", "mr_name", "relation_result"]
+        assert len(page["rows"]) <= 7
+        rows.extend(page["rows"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(rows) == page["total"] == 20 + 20 + 4
+    assert len({(row[1], row[0]) for row in rows}) == len(rows)
+    assert [str(row[0]) for row in rows[:len(report_ids)]] == report_ids
+    assert {row[2] for row in rows} == {"A", "B"}
+
+    response = client.get("/api/filter", query_string={"columns": "stdout"})
+    assert response.status_code == 400
+
+    test_run, test_case_id = rows[0][1], rows[0][0]
+    detail = client.get(f"/api/mtc_detail_view/{test_case_id}",
+                        query_string={"test_run": test_run}).get_json()
+    assert detail["_id"] == test_case_id
+    assert detail["test_run"] == test_run
+    assert detail["test_result"] == "passed"
+    assert isinstance(detail["source_inputs"], list)
+
+    # unknown MTCs are not found, in the API and in the detail view
+    response = client.get("/api/mtc_detail_view/9999", query_string={"test_run": test_run})
+    assert response.status_code == 404
+    assert "9999" in response.get_json()["error"]
+    assert client.get("/api/mtc_detail_view/9999").status_code == 404
+    response = client.get("/mtc_detail_view/9999", query_string={"test_run": test_run})
+    assert response.status_code == 404
+
+
+def test_bulk_export(app, client, mock_test_run_file):
+    """
+    The bulk export contains all filtered MTCs of the selected test runs in the order of
+    the report, as CSV, NDJSON and Parquet, in chunks of rows.
+    """
+    test_runs = ["metamorphic_test_run_2024-09-24_00-00-01.db",
+                 "metamorphic_test_run_2024-09-24_00-00-02.db"]
+    client.get("/select", query_string={"test_run": test_runs})
+    filters = {"mr_name": ["A", "B"], "columns": "mr_name,duration,relation_result"}
+    expected = client.get("/api/filter", query_string=dict(filters, limit=1000)).get_json()
+
+    response = client.get("/export/mtcs", query_string=dict(filters, format="csv"))
+    assert response.mimetype == "text/csv"
+    df_csv = pd.read_csv(io.StringIO(response.get_data(as_text=True)),
+                         float_precision="round_trip")
+    assert df_csv.columns.tolist() == expected["columns"]
+    assert df_csv.values.tolist() == expected["rows"]
+
+    response = client.get("/export/mtcs", query_string=dict(filters, format="ndjson"))
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record["_id"] for record in records] == [row[0] for row in expected["rows"]]
+    assert [record["duration"] for record in records] == pytest.approx(
+        [row[3] for row in expected["rows"]])
+
+    response = client.get("/export/mtcs", query_string=dict(filters, format="parquet"))
+    df_parquet = pd.read_parquet(io.BytesIO(response.data))
+    assert df_parquet.values.tolist() == expected["rows"]
+
+    assert client.get("/export/mtcs", query_string={"format": "xlsx"}).status_code == 400
+
+    # chunks of rows are written as one CSV file with a single header
+    with app.test_request_context():
+        run_set = get_run_set(test_runs)
+    columns = ["_id", "test_run", "mr_name"]
+    csv = "".join(iter_csv(iter_run_set_chunks(run_set, np.arange(len(run_set.df)), columns,
+                                               chunk_size=10), columns))
+    assert csv == run_set.df[columns].to_csv(index=False)
+
+    # an export without MTCs still has the header row
+    csv = "".join(iter_csv(iter_run_set_chunks(run_set, np.arange(0), columns), columns))
+    assert csv == "_id,test_run,mr_name\n"
+
+
+def test_failure_rate_table_fragment(app, client, mock_test_run_file):
+    """
+    The failure rate table is rendered once per run set and reused by later pages, the
+    time spent rendering the page is reported in the Server-Timing header.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    # a page size not requested before, the page is not in the page cache yet
+    response = client.get("/select", query_string={"test_run": test_run, "per_page": 7})
+    assert "render;dur=" in response.headers["Server-Timing"]
+    response = client.get("/select", query_string={"test_run": test_run, "per_page": 7})
+    assert "page-cache;desc=hit" in response.headers["Server-Timing"]
+
+    with app.test_request_context():
+        run_set = get_run_set([test_run])
+    html = app.extensions["export_cache"].get(("failure_rate_html",) + run_set.key)
+    assert html is not None and html in response.get_data(as_text=True)
+
+    table = BeautifulSoup(html, "html.parser")
+    headers = [th.text for th in table.find_all("th", class_="header")]
+    assert headers == run_set.df_fr.index.tolist()
+    cells = [td.text for td in table.find_all("td")]
+    assert cells == run_set.df_fr.to_numpy().ravel().tolist()
+
+    response = client.get("/?page=2")
+    assert html in response.get_data(as_text=True)
+
+
+def test_windowed_pagination(client, mock_test_run_file):
+    """
+    The report links the first and last page and a window around the current page, the
+    page size can be chosen per request and is kept by all pagination links.
+    """
+    assert get_page_window(1, 1) == [1]
+    assert get_page_window(1, 5, window=1) == [1, 2, None, 5]
+    assert get_page_window(12, 24, window=3) == [1, None, 9, 10, 11, 12, 13, 14, 15, None, 24]
+
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    client.get("/select", query_string={"test_run": test_run})
+    response = client.get("/filter",
+                          query_string={"mr_name": "all", "per_page": 5, "page": 12})
+    soup = BeautifulSoup(response.data, "html.parser")
+
+    assert len(soup.find_all("a", href=lambda href: href and "mtc_detail_view/" in href)) == 5
+    pagination_links = soup.select(".pagination a")
+    page_numbers = [link.get_text() for link in pagination_links if link.get_text().isdigit()]
+    assert page_numbers == ["1", "9", "10", "11", "12", "13", "14", "15", "24"]
+    for link in pagination_links:
+        assert "per_page=5" in link["href"] and "mr_name=all" in link["href"]
+
+    # the page form submits the filters along with the page number
+    hidden = {(field["name"], field["value"])
+              for field in soup.select(".page-form input[type=hidden]")}
+    assert hidden == {("mr_name", "all"), ("per_page", "5")}
+
+
+def test_report_http_caching(app, client, mock_test_run_file):
+    """
+    Report pages carry a weak ETag and Last-Modified derived from the selected test run
+    files and the filters, revalidation is answered with 304 and compressed pages are
+    served to clients that accept gzip.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    response = client.get("/select", query_string={"test_run": test_run})
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.last_modified is not None
+    assert "Cookie" in response.headers["Vary"]
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    response = client.get("/select", query_string={"test_run": test_run},
+                          headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # the landing page of the same selection is another page with its own ETag
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    landing_etag = response.headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": landing_etag}).status_code == 304
+
+    response = client.get("/filter", query_string={"mr_name": "A"},
+                          headers={"If-None-Match": landing_etag})
+    assert response.status_code == 200 and response.headers["ETag"] != landing_etag
+
+    plain = client.get("/filter", query_string={"mr_name": "A"})
+    compressed = client.get("/filter", query_string={"mr_name": "A"},
+                            headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == plain.headers["ETag"]
+    assert gzip.decompress(compressed.data) == plain.data
+    assert ((plain.headers["ETag"][3:-1], "gzip")) in app.extensions["page_cache"]
+
+    # rewriting the test run file changes the ETag
+    db_path = project_root_path / "gemtest_results" / test_run
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    try:
+        response = client.get("/filter", query_string={"mr_name": "A"})
+        assert response.headers["ETag"] != plain.headers["ETag"]
+    finally:
+        os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_detail_view_artifact_images(tmp_path):
+    """
+    Values of an MTC that name a file below the configured artifact root are shown as
+    images served from the artifact root, other values are shown as text.
+    """
+    test_run = "metamorphic_test_run_2024-09-24_00-00-01.db"
+    results_dir = tmp_path / "gemtest_results"
+    results_dir.mkdir()
+    shutil.copy(tests_end2end_path / "test_data" / test_run, results_dir / test_run)
+    conn = sqlite3.connect(results_dir / test_run)
+    conn.execute("UPDATE mtc_results SET source_inputs = 'img/input_1.png' WHERE _id = 1")
+    conn.commit()
+    conn.close()
+
+    artifact_root = tmp_path / "artifacts"
+    (artifact_root / "img").mkdir(parents=True)
+    (artifact_root / "img" / "input_1.png").write_bytes(b"\x89PNG")
+
+    flask_app = create_app(results_dir, tmp_path / "cache", scan_interval=0,
+                           artifact_root=artifact_root)
+    client = flask_app.test_client()
+    soup = BeautifulSoup(client.get("/mtc_detail_view/1").data, "html.parser")
+    images = [img["src"] for img in soup.find_all("img")]
+    assert len(images) == 1 and images[0].startswith("/thumbnails/img/input_1.png?v=")
+    full_images = [img.find_parent("a")["href"] for img in soup.find_all("img")]
+    assert full_images[0].startswith("/artifacts/img/input_1.png?v=")
+    assert client.get(full_images[0]).data == b"\x89PNG"
+
+
+def test_artifact_caching_headers(tmp_path):
+    """
+    Artifacts requested with their current version may be cached forever, other requests
+    are revalidated with the ETag. Conditional and range requests are supported.
+    """
+    artifact_root = tmp_path / "artifacts"
+    (artifact_root / "img").mkdir(parents=True)
+    (artifact_root / "img" / "plot.png").write_bytes(b"0123456789")
+    flask_app = create_app(tmp_path / "gemtest_results", tmp_path / "cache",
+                           artifact_root=artifact_root)
+    client = flask_app.test_client()
+    version = ArtifactManifest(artifact_root).get_version("img/plot.png")
+
+    response = client.get("/artifacts/img/plot.png", query_string={"v": version})
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    etag = response.headers["ETag"]
+
+    response = client.get("/artifacts/img/plot.png")
+    assert response.headers["Cache-Control"] == "no-cache"
+    response = client.get("/artifacts/img/plot.png", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get("/artifacts/img/plot.png", headers={"Range": "bytes=2-5"})
+    assert response.status_code == 206
+    assert response.data == b"2345"
+
+    assert client.get("/artifacts/../secret.txt").status_code == 404
+    assert client.get("/artifacts/img").status_code == 404
+
+
+def test_thumbnails(tmp_path):
+    """
+    Thumbnails are generated on the first request and cached on disk, files that are not
+    images are served as they are.
+    """
+    Image = pytest.importorskip("PIL.Image")
+
+    artifact_root = tmp_path / "artifacts"
+    (artifact_root / "img").mkdir(parents=True)
+    Image.new("RGB", (1000, 500), "red").save(artifact_root / "img" / "large.png")
+    (artifact_root / "img" / "notes.txt").write_text("not an image")
+    flask_app = create_app(tmp_path / "gemtest_results", tmp_path / "cache",
+                           artifact_root=artifact_root)
+    client = flask_app.test_client()
+
+    response = client.get("/thumbnails/img/large.png")
+    with Image.open(io.BytesIO(response.data)) as thumbnail:
+        assert thumbnail.size == (200, 100)
+    assert len(list((tmp_path / "cache" / "thumbnails").iterdir())) == 1
+
+    response = client.get("/thumbnails/img/notes.txt")
+    assert response.data == b"not an image"